@@ -0,0 +1,277 @@
+import hmac
+import json
+from collections import namedtuple
+from datetime import datetime, timedelta
+from itertools import islice
+
+from flask import Blueprint, Response, abort, current_app, jsonify, request, stream_with_context
+
+import exporter
+from extensions import db, metrics, response_cache
+from models import Artist, Genre, Show, ShowListing, Venue, artist_genre, as_utc, delete_owners, utc_now, \
+    venue_genre
+from pagination import keyset_paginate
+from request_args import calendar_args, page_args, page_url
+
+bp = Blueprint('api', __name__)
+
+
+ApiResource = namedtuple('ApiResource', ['model', 'fields', 'keys', 'genre_key'])
+
+
+def api_resources():
+    return {
+        'venues': ApiResource(Venue, {
+            'id': Venue.id, 'name': Venue.name, 'city': Venue.city, 'state': Venue.state,
+            'address': Venue.address, 'phone': Venue.phone, 'image_link': Venue.image_link,
+            'facebook_link': Venue.facebook_link, 'website': Venue.website,
+            'seeking_talent': Venue.seeking_talent, 'updated_at': Venue.updated_at,
+            'upcoming_shows_count': Venue.upcoming_shows_count, 'past_shows_count': Venue.past_shows_count,
+            'next_show_time': Venue.next_show_time
+        }, [Venue.name, Venue.id], venue_genre.c.venue_id),
+        'artists': ApiResource(Artist, {
+            'id': Artist.id, 'name': Artist.name, 'city': Artist.city, 'state': Artist.state,
+            'phone': Artist.phone, 'image_link': Artist.image_link,
+            'facebook_link': Artist.facebook_link, 'website': Artist.website,
+            'seeking_venue': Artist.seeking_venue, 'updated_at': Artist.updated_at,
+            'upcoming_shows_count': Artist.upcoming_shows_count, 'past_shows_count': Artist.past_shows_count,
+            'next_show_time': Artist.next_show_time
+        }, [Artist.name, Artist.id], artist_genre.c.artist_id),
+        'shows': ApiResource(Show, {
+            'id': Show.id, 'venue_id': Show.venue_id, 'artist_id': Show.artist_id,
+            'start_time': Show.start_time, 'end_time': Show.end_time,
+            'venue_name': Venue.name.label('venue_name'),
+            'venue_image_link': Venue.image_link.label('venue_image_link'),
+            'artist_name': Artist.name.label('artist_name'),
+            'artist_image_link': Artist.image_link.label('artist_image_link')
+        }, [Show.start_time, Show.id], None)
+    }
+
+
+def api_error(message, status=400):
+    return jsonify({'error': message}), status
+
+
+def check_bearer(config_key, realm):
+    """The 401 response unless the request carries the ``config_key`` token.
+
+    Aborts with 404 while no token is configured, so the endpoint is off.
+    """
+    token = current_app.config[config_key]
+    if not token:
+        abort(404)
+    supplied = request.headers.get('Authorization', '')
+    if not hmac.compare_digest(supplied.encode('utf-8'), f'Bearer {token}'.encode('utf-8')):
+        return Response(f'{realm.capitalize()} requires a valid bearer token.', 401,
+                        {'WWW-Authenticate': f'Bearer realm="{realm}"'})
+    return None
+
+
+def api_value(value):
+    return value.isoformat() if isinstance(value, datetime) else value
+
+
+def api_rows(resource, fields, rows):
+    genres = {}
+    if 'genres' in fields:
+        genres = Genre.names_for(resource.genre_key, [row.id for row in rows])
+    for row in rows:
+        item = {name: api_value(getattr(row, name)) for name in fields if name != 'genres'}
+        if 'genres' in fields:
+            item['genres'] = genres.get(row.id, [])
+        yield item
+
+
+def api_ndjson(resource, fields, query):
+    batch_size = current_app.config['API_STREAM_BATCH_SIZE']
+    rows = iter(query.order_by(*resource.keys).yield_per(batch_size))
+    while True:
+        batch = list(islice(rows, batch_size))
+        if not batch:
+            break
+        yield ''.join(json.dumps(item) + '\n' for item in api_rows(resource, fields, batch))
+
+
+@bp.route('/api/v1/<any(venues, artists, shows):kind>')
+def api_list(kind):
+    resource = api_resources()[kind]
+    available = list(resource.fields) + (['genres'] if resource.genre_key is not None else [])
+    fields = request.args.get('fields')
+    fields = [name.strip() for name in fields.split(',') if name.strip()] if fields else available
+    unknown = [name for name in fields if name not in available]
+    if unknown:
+        return api_error(f"Unknown fields: {', '.join(unknown)}")
+
+    # The paging keys (and the id the genres are looked up by) are always selected.
+    selected = dict((name, resource.fields[name]) for name in fields if name != 'genres')
+    for key in resource.keys:
+        selected.setdefault(key.key, key)
+    query = db.session.query(*selected.values())
+    if resource.model is Show:
+        query = query.select_from(Show).join(Venue, Venue.id == Show.venue_id) \
+            .join(Artist, Artist.id == Show.artist_id)
+    genre = request.args.get('genre')
+    if genre and resource.genre_key is not None:
+        query = query.filter(resource.model.in_genre(genre))
+
+    if request.args.get('format') == 'ndjson' or \
+            request.accept_mimetypes.best == 'application/x-ndjson':
+        return Response(stream_with_context(api_ndjson(resource, fields, query)),
+                        mimetype='application/x-ndjson')
+
+    try:
+        page = keyset_paginate(query, resource.keys, **page_args())
+    except ValueError:
+        return api_error('Malformed cursor')
+    return jsonify({
+        'data': list(api_rows(resource, fields, page.items)),
+        'next_cursor': page.next_cursor,
+        'prev_cursor': page.prev_cursor,
+        'next': page_url(after=page.next_cursor) if page.next_cursor else None,
+        'prev': page_url(before=page.prev_cursor) if page.prev_cursor else None
+    })
+
+
+CALENDAR_FIELDS = ('id', 'venue_id', 'artist_id', 'start_time', 'venue_name', 'venue_image_link',
+                   'venue_city', 'venue_state', 'artist_name', 'artist_image_link')
+
+
+def calendar_json(args, days):
+    """The calendar document in chunks, one per day, as the rows are read."""
+    yield json.dumps({'city': args['city'], 'state': args['state'], 'from': args['start'].isoformat(),
+                      'to': args['end'].isoformat()})[:-1] + ', "days": ['
+    separator = ''
+    for day, shows in days:
+        yield separator + json.dumps({
+            'date': day.isoformat(),
+            'shows': [{name: api_value(as_utc(row.start_time) if name == 'start_time' else getattr(row, name))
+                       for name in CALENDAR_FIELDS} for row in shows]})
+        separator = ', '
+    yield ']}'
+
+
+@bp.route('/api/v1/shows/calendar')
+def api_calendar():
+    """JSON twin of /shows/calendar, streamed one day at a time."""
+    try:
+        args = calendar_args()
+    except ValueError as e:
+        return api_error(str(e) or 'Malformed from/to; use ISO 8601')
+    rows = ShowListing.calendar_query(**args).yield_per(current_app.config['API_STREAM_BATCH_SIZE'])
+    days = ShowListing.group_by_day(rows, args['start'].tzinfo)
+    return Response(stream_with_context(calendar_json(args, days)),
+                    mimetype='application/json')
+
+
+@bp.route('/<any(venues, artists):kind>/<int:entity_id>/availability')
+def availability(kind, entity_id):
+    """Booked shows and free time of a venue or artist between ``from`` and ``to``.
+
+    Both default to the next ``AVAILABILITY_DEFAULT_DAYS`` days and may span
+    at most ``AVAILABILITY_MAX_DAYS``. The shows come from one range scan of
+    the owner's (id, start_time) index, whatever the size of its history.
+    """
+    model = Venue if kind == 'venues' else Artist
+    try:
+        start = exporter.parse_since(request.args['from']) if request.args.get('from') else utc_now()
+        end = exporter.parse_since(request.args['to']) if request.args.get('to') else \
+            start + timedelta(days=current_app.config['AVAILABILITY_DEFAULT_DAYS'])
+    except ValueError:
+        return api_error('Malformed from/to; use ISO 8601')
+    if not start < end <= start + timedelta(days=current_app.config['AVAILABILITY_MAX_DAYS']):
+        return api_error(f"to must be after from and at most {current_app.config['AVAILABILITY_MAX_DAYS']} "
+                         f"days later")
+    if db.session.query(model.id).filter(model.id == entity_id).scalar() is None:
+        return api_error(f'No such {kind[:-1]}', 404)
+
+    busy, free = Show.availability(kind[:-1], entity_id, start, end)
+    return jsonify({
+        f'{kind[:-1]}_id': entity_id,
+        'from': start.isoformat(),
+        'to': end.isoformat(),
+        'busy': [{'show_id': row.id, 'start_time': api_value(as_utc(row.start_time)),
+                  'end_time': api_value(as_utc(row.end_time))} for row in busy],
+        'free': [{'start_time': slot_start.isoformat(), 'end_time': slot_end.isoformat()}
+                 for slot_start, slot_end in free]
+    })
+
+
+@bp.route('/<any(venues, artists):kind>', methods=['DELETE'])
+def bulk_delete(kind):
+    """Delete many venues or artists, with their shows, in one statement.
+
+    The ids come from a JSON body, ``{"ids": [1, 2]}``, or ``?ids=1,2``, at
+    most ``BULK_DELETE_MAX_IDS`` of them. Ids that do not exist are reported
+    as missing rather than failing the request. Requires the
+    ``BULK_DELETE_TOKEN`` bearer token; without one configured the endpoint
+    is off.
+    """
+    unauthorized = check_bearer('BULK_DELETE_TOKEN', 'delete')
+    if unauthorized is not None:
+        return unauthorized
+
+    model = Venue if kind == 'venues' else Artist
+    body = request.get_json(silent=True)
+    try:
+        if body is not None:
+            ids = [int(entity_id) for entity_id in body['ids']]
+        else:
+            ids = [int(entity_id) for entity_id in request.args.get('ids', '').split(',') if entity_id]
+    except (KeyError, TypeError, ValueError):
+        return api_error('ids must be a list of integers')
+    if not ids:
+        return api_error('No ids given')
+    if len(ids) > current_app.config['BULK_DELETE_MAX_IDS']:
+        return api_error(f"At most {current_app.config['BULK_DELETE_MAX_IDS']} ids per request")
+
+    try:
+        deleted, partner_ids = delete_owners(model, ids)
+        db.session.commit()
+    except:
+        db.session.rollback()
+        return api_error(f'An error occurred. The {kind} could not be deleted.', 500)
+    finally:
+        db.session.close()
+    other = 'artist' if model is Venue else 'venue'
+    response_cache.invalidate('venues', 'artists', 'shows',
+                              *[f'{kind[:-1]}:{entity_id}' for entity_id in deleted],
+                              *[f'{other}:{partner_id}' for partner_id in partner_ids])
+    return jsonify({'deleted': sorted(deleted), 'missing': sorted(set(ids) - set(deleted))})
+
+
+@bp.route('/cache/stats')
+def cache_stats():
+    return jsonify(response_cache.stats())
+
+
+@bp.route('/metrics')
+def metrics_view():
+    if not current_app.config['METRICS_ENABLED']:
+        abort(404)
+    return Response(metrics.render(), mimetype='text/plain; version=0.0.4')
+
+
+@bp.route('/export/<any(venues, artists, shows):kind>')
+def export(kind):
+    unauthorized = check_bearer('EXPORT_TOKEN', 'export')
+    if unauthorized is not None:
+        return unauthorized
+
+    fmt = request.args.get('format', 'csv')
+    if fmt not in exporter.FORMATS:
+        abort(400)
+    try:
+        since = exporter.parse_since(request.args['since']) if request.args.get('since') else None
+    except ValueError:
+        abort(400)
+
+    chunks = exporter.export_chunks(db.read_engine, db.metadata, kind, fmt, since=since,
+                                    batch_size=current_app.config['EXPORT_BATCH_SIZE'])
+    headers = {'Content-Disposition': f'attachment; filename={kind}.{fmt}'}
+    if 'gzip' in request.accept_encodings:
+        chunks = exporter.gzip_chunks(chunks, current_app.config['EXPORT_GZIP_LEVEL'])
+        headers['Content-Encoding'] = 'gzip'
+    headers['Vary'] = 'Accept-Encoding'
+    mimetype = 'text/csv' if fmt == 'csv' else 'application/x-ndjson'
+    return Response(chunks, mimetype=mimetype, headers=headers)
+
@@ -0,0 +1,168 @@
+import gzip
+import hashlib
+import json
+import mimetypes
+import os
+import re
+
+from flask import current_app, request, safe_join, send_file, url_for
+from werkzeug.exceptions import NotFound
+
+# Bundles in the order the layout loads them; each lists its sources
+# relative to the static folder, concatenated in that order.
+BUNDLES = {
+    'main.css': ['css/bootstrap.min.css', 'css/layout.main.css', 'css/main.css',
+                 'css/main.responsive.css', 'css/main.quickfix.css'],
+    'head.js': ['js/libs/modernizr-2.8.2.min.js', 'js/libs/moment.min.js'],
+    'main.js': ['js/script.js', 'js/libs/bootstrap-3.1.1.min.js', 'js/plugins.js'],
+}
+
+MANIFEST = 'manifest.json'
+
+# Precompressed siblings, in order of preference when the client accepts both.
+ENCODINGS = (('br', '.br'), ('gzip', '.gz'))
+
+_CSS_COMMENT = re.compile(r'/\*.*?\*/', re.S)
+_CSS_SPACE = re.compile(r'\s+')
+_CSS_PUNCTUATION = re.compile(r'\s*([{};,>])\s*')
+_JS_LINE_COMMENT = re.compile(r'^\s*//.*$', re.M)
+
+
+def minify_css(source):
+    source = _CSS_COMMENT.sub('', source)
+    source = _CSS_SPACE.sub(' ', source)
+    return _CSS_PUNCTUATION.sub(r'\1', source).replace(';}', '}').strip()
+
+
+def minify_js(source):
+    """Drop whole-line comments, indentation and blank lines.
+
+    Deliberately conservative: statements and newlines are left alone, so
+    automatic semicolon insertion still sees the code it was written for.
+    The vendored libraries are minified already and pass through untouched.
+    """
+    source = _JS_LINE_COMMENT.sub('', source)
+    return '\n'.join(line.strip() for line in source.splitlines() if line.strip())
+
+
+def bundle(static_folder, sources, minify):
+    parts = []
+    for source in sources:
+        with open(os.path.join(static_folder, source), encoding='utf-8') as f:
+            text = f.read()
+        parts.append(text if '.min.' in source else minify(text))
+    # A semicolon keeps a script without a trailing one from running into the next.
+    return (';\n' if minify is minify_js else '\n').join(parts).encode('utf-8')
+
+
+def build(static_folder, dist_folder, bundles=BUNDLES):
+    """Write the bundles with content-hashed names and their manifest.
+
+    Each bundle also gets ``.gz`` and, when the ``brotli`` package is
+    installed, ``.br`` siblings compressed at the highest level, so
+    requests never pay for compression. Returns the manifest.
+    """
+    try:
+        import brotli
+    except ImportError:
+        brotli = None
+
+    os.makedirs(dist_folder, exist_ok=True)
+    manifest = {}
+    for name, sources in bundles.items():
+        stem, extension = os.path.splitext(name)
+        body = bundle(static_folder, sources, minify_css if extension == '.css' else minify_js)
+        filename = f'{stem}.{hashlib.sha256(body).hexdigest()[:12]}{extension}'
+        path = os.path.join(dist_folder, filename)
+        with open(path, 'wb') as f:
+            f.write(body)
+        # mtime=0 keeps the gzip output, and so ETags, identical between builds.
+        with open(path + '.gz', 'wb') as f:
+            f.write(gzip.compress(body, compresslevel=9, mtime=0))
+        if brotli is not None:
+            with open(path + '.br', 'wb') as f:
+                f.write(brotli.compress(body, quality=11))
+        manifest[name] = filename
+
+    with open(os.path.join(dist_folder, MANIFEST), 'w') as f:
+        json.dump(manifest, f, indent=2, sort_keys=True)
+    return manifest
+
+
+def accepted_encodings():
+    """Content codings the client accepts, by name; ``q=0`` excludes one."""
+    return {encoding for encoding, quality in request.accept_encodings if quality > 0}
+
+
+class _AssetsState(object):
+    """The last manifest one application read, and its mtime."""
+
+    def __init__(self):
+        self.manifest = None
+        self.manifest_mtime = None
+
+
+class Assets(object):
+    """Serves the built bundles from ``/static/dist`` and links to them.
+
+    Templates call ``asset_urls('main.css')``. Once ``flask assets build``
+    has written a manifest that is the single hashed bundle, served with a
+    year-long immutable ``Cache-Control`` and, when the client accepts it,
+    from its precompressed sibling. Without a manifest (during development)
+    it lists the source files, so the pages work without a build step.
+    """
+
+    def __init__(self, app=None):
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        app.config.setdefault('ASSETS_DIST_FOLDER', os.path.join(app.static_folder, 'dist'))
+        app.config.setdefault('ASSETS_MAX_AGE', 365 * 24 * 3600)
+
+        app.add_url_rule(app.static_url_path + '/dist/<path:filename>', 'dist', self.serve)
+        app.add_template_global(self.asset_urls)
+        app.extensions['assets'] = _AssetsState()
+
+    @staticmethod
+    def manifest():
+        # Re-read after a rebuild, so a running app links to the new bundles.
+        state = current_app.extensions['assets']
+        path = os.path.join(current_app.config['ASSETS_DIST_FOLDER'], MANIFEST)
+        try:
+            mtime = os.stat(path).st_mtime
+        except OSError:
+            return {}
+        if mtime != state.manifest_mtime:
+            with open(path) as f:
+                state.manifest = json.load(f)
+            state.manifest_mtime = mtime
+        return state.manifest
+
+    def asset_urls(self, name):
+        filename = self.manifest().get(name)
+        if filename is not None:
+            return [url_for('dist', filename=filename)]
+        return [url_for('static', filename=source) for source in BUNDLES[name]]
+
+    def serve(self, filename):
+        path = safe_join(current_app.config['ASSETS_DIST_FOLDER'], filename)
+        if path is None or filename == MANIFEST or not os.path.isfile(path):
+            raise NotFound()
+
+        accepted = accepted_encodings()
+        for encoding, suffix in ENCODINGS:
+            if encoding in accepted and os.path.isfile(path + suffix):
+                response = send_file(path + suffix, mimetype=mimetypes.guess_type(filename)[0],
+                                     conditional=True)
+                response.headers['Content-Encoding'] = encoding
+                break
+        else:
+            response = send_file(path, conditional=True)
+
+        response.vary.add('Accept-Encoding')
+        response.cache_control.public = True
+        response.cache_control.max_age = current_app.config['ASSETS_MAX_AGE']
+        response.cache_control.immutable = True
+        return response
+
@@ -0,0 +1,64 @@
+"""Bytes on the wire and CPU time per route, uncompressed and compressed.
+
+Seeds a database with ``seed.py`` like ``routes.py`` and fetches every GET
+route with ``Accept-Encoding: identity``, ``gzip`` and, when the Brotli
+package is installed, ``br``. Reports the body size and the median process
+CPU time per request for each, so the cost of a compression level can be
+weighed against the bytes it saves:
+
+    python benchmarks/compression.py --scale 100k --level 6 --brotli-quality 4
+"""
+import argparse
+import os
+import statistics
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from routes import EXPORT_TOKEN, cases, setup  # noqa: E402
+from compression import brotli  # noqa: E402
+from seed import SCALES  # noqa: E402
+
+ENCODINGS = ['identity', 'gzip'] + (['br'] if brotli is not None else [])
+
+
+def measure(client, path, encoding, repeat):
+    cpu, size = [], 0
+    for _ in range(repeat):
+        started = time.process_time()
+        response = client.get(path, headers={'Accept-Encoding': encoding,
+                                            'Authorization': f'Bearer {EXPORT_TOKEN}'})
+        size = len(response.get_data())
+        cpu.append((time.process_time() - started) * 1000)
+        response.close()
+    return size, statistics.median(cpu)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--scale', choices=list(SCALES), default='1k')
+    parser.add_argument('--seed', type=int, default=1)
+    parser.add_argument('--repeat', type=int, default=20)
+    parser.add_argument('--level', type=int, default=6, help='gzip level, 1-9.')
+    parser.add_argument('--brotli-quality', type=int, default=4, help='Brotli quality, 0-11.')
+    args = parser.parse_args()
+
+    app, venue_ids, artist_ids = setup(args.scale, args.seed, config={
+        'COMPRESS_LEVEL': args.level, 'COMPRESS_BROTLI_QUALITY': args.brotli_quality})
+    client = app.test_client()
+
+    print(f'{"route":26}' + ''.join(f'{encoding:>24}' for encoding in ENCODINGS))
+    for name, _, method, path, _ in cases(venue_ids, artist_ids):
+        if method != 'GET':
+            continue
+        path = path(0) if callable(path) else path
+        client.get(path)
+        results = [measure(client, path, encoding, args.repeat) for encoding in ENCODINGS]
+        identity = results[0][0] or 1
+        print(f'{name:26}' + ''.join(f'{size:9,} B {size / identity:4.0%} {cpu:5.1f} ms'
+                                     for size, cpu in results))
+
+
+if __name__ == '__main__':
+    main()
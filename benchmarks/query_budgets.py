@@ -0,0 +1,116 @@
+"""SQL statements per request, checked against a fixed budget per route.
+
+Seeds a database at two scales and issues every request from
+``routes.py`` against each. It fails when a route runs more statements
+than its budget, or more at the larger scale than at the smaller one,
+which is how an N+1 query shows up:
+
+    python benchmarks/query_budgets.py --scales 1k 100k
+
+The test suite runs the same check at two small scales
+(tests/test_query_budgets.py); this script is for the larger ones.
+"""
+import argparse
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from routes import cases, request, setup, uncovered  # noqa: E402
+from seed import SCALES  # noqa: E402
+
+# Maximum statements per request, by routes.py case name.
+BUDGETS = {
+    'index': 0,
+    'venues': 1,
+    'venues?genre': 1,
+    'venues?after': 1,
+    'search_venues': 1,
+    'show_venue': 6,
+    'show_venue (quiet)': 6,
+    'create_venue_form': 0,
+    'edit_venue': 2,
+    'artists': 1,
+    'artists?genre': 1,
+    'search_artists': 1,
+    'show_artist': 6,
+    'create_artist_form': 0,
+    'edit_artist': 2,
+    'shows': 1,
+    'search_shows': 1,
+    'shows_calendar': 1,
+    'shows_calendar (month)': 1,
+    'create_shows': 0,
+    'create_shows_batch': 0,
+    'venue availability': 2,
+    'artist availability': 2,
+    'api venues': 2,
+    'api shows': 1,
+    'api calendar': 1,
+    'api artists ndjson': 1,
+    'export shows': 1,
+    'cache_stats': 0,
+    'metrics': 0,
+    'create_venue_submission': 3,
+    'edit_venue_submission': 7,
+    'create_artist_submission': 3,
+    'edit_artist_submission': 7,
+    'create_show_submission': 12,
+    'shows_batch_submission': 15,
+    'delete_venue': 5,
+    'delete_artist': 5,
+    'bulk delete artists': 5,
+}
+
+
+def measure(scale, random_seed):
+    app, venue_ids, artist_ids = setup(scale, random_seed)
+    benchmark_cases = cases(venue_ids, artist_ids)
+    counts = {}
+    for name, _, method, path, data in benchmark_cases:
+        client = app.test_client()
+        # The second request is counted; the first one warms up the app.
+        for i in range(2):
+            statements = request(client, method, path(i) if callable(path) else path,
+                                 data(i) if callable(data) else data)
+        counts[name] = statements
+    return counts, uncovered(app, benchmark_cases)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--scales', nargs=2, choices=list(SCALES), default=['1k', '100k'])
+    parser.add_argument('--seed', type=int, default=1)
+    parser.add_argument('--verbose', action='store_true', help='Print the statements of failing routes.')
+    args = parser.parse_args()
+
+    small, missing = measure(args.scales[0], args.seed)
+    large, _ = measure(args.scales[1], args.seed)
+
+    failures = []
+    for name, budget in BUDGETS.items():
+        counts = (len(small[name]), len(large[name]))
+        problems = []
+        if max(counts) > budget:
+            problems.append(f'over budget of {budget}')
+        if counts[1] > counts[0]:
+            problems.append('grows with the data')
+        print(f'{name:26} {counts[0]:3} / {counts[1]:3}   budget {budget:3}'
+              f'{"   FAIL: " + ", ".join(problems) if problems else ""}')
+        if problems:
+            failures.append(name)
+            if args.verbose:
+                for statement in large[name]:
+                    print('    ' + ' '.join(statement.split())[:200])
+
+    unbudgeted = sorted(set(small) - set(BUDGETS))
+    for name in unbudgeted:
+        print(f'{name:26} has no budget', file=sys.stderr)
+    for endpoint in missing:
+        print(f'{endpoint:26} has no request in routes.py', file=sys.stderr)
+    if failures or unbudgeted or missing:
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,247 @@
+"""Route latency, query count and memory at a given catalog size.
+
+Seeds a fresh database with ``seed.py`` at the chosen scale and drives every
+route through the Flask test client, reporting p50/p95/p99 latency, SQL
+statements per request and peak Python memory per route. Runs against
+DATABASE_URL (the tables are dropped and recreated), or a throwaway SQLite
+file when it is not set:
+
+    python benchmarks/routes.py --scale 100k --save benchmarks/baselines/100k.json
+    python benchmarks/routes.py --scale 100k --compare benchmarks/baselines/100k.json
+"""
+import argparse
+import json
+import os
+import platform
+import subprocess
+import sys
+import tempfile
+import time
+import tracemalloc
+from datetime import datetime, timedelta
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from app import create_app  # noqa: E402
+from extensions import db  # noqa: E402
+from instrumentation import count_queries  # noqa: E402
+from seed import SCALES, seed  # noqa: E402
+
+EXPORT_TOKEN = 'benchmark'
+
+VENUE_FORM = {'name': 'Benchmark Hall', 'city': 'New York', 'state': 'NY', 'address': '1 Main St',
+              'phone': '212-555-0100', 'genres': ['Jazz', 'Blues'],
+              'image_link': 'https://images.example.com/bench.jpg',
+              'facebook_link': 'https://www.facebook.com/bench', 'website': 'https://bench.example.com',
+              'seeking_artist': 'y'}
+ARTIST_FORM = {'name': 'Benchmark Trio', 'city': 'New York', 'state': 'NY', 'phone': '212-555-0101',
+               'genres': ['Jazz'], 'image_link': 'https://images.example.com/trio.jpg',
+               'facebook_link': 'https://www.facebook.com/trio', 'website': 'https://trio.example.com',
+               'seeking_venue': 'y'}
+
+
+def cases(venue_ids, artist_ids):
+    """(name, endpoint, method, path, form data) per benchmarked request.
+
+    ``path`` and ``data`` may be callables of the iteration number. The
+    first venue and artist are the busiest ones. Writes come last and the
+    deletes go at the very end, each removing different venues or artists
+    from the quiet end of the lists. New shows
+    go after the seeded ones, a day apart, so none is double-booked.
+    """
+    venue_id, artist_id = venue_ids[0], artist_ids[0]
+    first_show = datetime.now().replace(hour=12, minute=0, second=0, microsecond=0) + timedelta(days=400)
+    availability_from = datetime.now().replace(microsecond=0).isoformat()
+    calendar_to = (datetime.now() + timedelta(days=31)).date().isoformat()
+    export_since = (datetime.now() - timedelta(minutes=5)).isoformat()
+    return [
+        ('index', 'main.index', 'GET', '/', None),
+        ('venues', 'main.venues', 'GET', '/venues', None),
+        ('venues?genre', 'main.venues', 'GET', '/venues?genre=Jazz', None),
+        ('venues?after', 'main.venues', 'GET', '/venues?after=WyJNIiwwXQ', None),
+        ('search_venues', 'main.search_venues', 'POST', '/venues/search', {'search_term': 'hall'}),
+        ('show_venue', 'main.show_venue', 'GET', f'/venues/{venue_id}', None),
+        ('show_venue (quiet)', 'main.show_venue', 'GET', f'/venues/{venue_ids[-1]}', None),
+        ('create_venue_form', 'main.create_venue_form', 'GET', '/venues/create', None),
+        ('edit_venue', 'main.edit_venue', 'GET', f'/venues/{venue_id}/edit', None),
+        ('artists', 'main.artists', 'GET', '/artists', None),
+        ('artists?genre', 'main.artists', 'GET', '/artists?genre=Rock+n+Roll', None),
+        ('search_artists', 'main.search_artists', 'POST', '/artists/search', {'search_term': 'owl'}),
+        ('show_artist', 'main.show_artist', 'GET', f'/artists/{artist_id}', None),
+        ('create_artist_form', 'main.create_artist_form', 'GET', '/artists/create', None),
+        ('edit_artist', 'main.edit_artist', 'GET', f'/artists/{artist_id}/edit', None),
+        ('shows', 'main.shows', 'GET', '/shows', None),
+        ('search_shows', 'main.search_shows', 'POST', '/shows/search', {'search_term': 'velvet'}),
+        ('shows_calendar', 'main.shows_calendar', 'GET', '/shows/calendar?city=New+York&state=NY', None),
+        ('shows_calendar (month)', 'main.shows_calendar', 'GET', f'/shows/calendar?to={calendar_to}', None),
+        ('create_shows', 'main.create_shows', 'GET', '/shows/create', None),
+        ('create_shows_batch', 'main.create_shows_batch', 'GET', '/shows/batch', None),
+        ('venue availability', 'api.availability', 'GET',
+         f'/venues/{venue_id}/availability?from={availability_from}', None),
+        ('artist availability', 'api.availability', 'GET', f'/artists/{artist_id}/availability', None),
+        ('api venues', 'api.api_list', 'GET', '/api/v1/venues', None),
+        ('api shows', 'api.api_list', 'GET', '/api/v1/shows?fields=id,start_time,venue_name', None),
+        ('api calendar', 'api.api_calendar', 'GET',
+         f'/api/v1/shows/calendar?city=New+York&state=NY&to={calendar_to}', None),
+        ('api artists ndjson', 'api.api_list', 'GET', '/api/v1/artists?format=ndjson&fields=id,name', None),
+        ('export shows', 'api.export', 'GET', f'/export/shows?since={export_since}', None),
+        ('cache_stats', 'api.cache_stats', 'GET', '/cache/stats', None),
+        ('metrics', 'api.metrics_view', 'GET', '/metrics', None),
+        ('create_venue_submission', 'main.create_venue_submission', 'POST', '/venues/create', VENUE_FORM),
+        ('edit_venue_submission', 'main.edit_venue_submission', 'POST', f'/venues/{venue_id}/edit',
+         VENUE_FORM),
+        ('create_artist_submission', 'main.create_artist_submission', 'POST', '/artists/create',
+         ARTIST_FORM),
+        ('edit_artist_submission', 'main.edit_artist_submission', 'POST', f'/artists/{artist_id}/edit',
+         ARTIST_FORM),
+        ('create_show_submission', 'main.create_show_submission', 'POST', '/shows/create',
+         lambda i: {'venue_id': venue_id, 'artist_id': artist_id, 'duration': 120,
+                    'start_time': (first_show + timedelta(days=i)).strftime('%Y-%m-%d %H:%M:%S')}),
+        ('shows_batch_submission', 'main.create_shows_batch_submission', 'POST', '/shows/batch',
+         lambda i: {'shows': '\n'.join(f'{artist_ids[k]}, {venue_ids[k]}, {first_show + timedelta(days=200 + i)}'
+                                       for k in range(20))}),
+        ('delete_venue', 'main.delete_venue', 'DELETE',
+         lambda i: f'/venues/{venue_ids[-2 - i]}/delete', None),
+        ('delete_artist', 'main.delete_artist', 'DELETE',
+         lambda i: f'/artists/{artist_ids[-2 - i]}/delete', None),
+        ('bulk delete artists', 'api.bulk_delete', 'DELETE',
+         lambda i: f'/artists?ids={artist_ids[-35 - 2 * i]},{artist_ids[-36 - 2 * i]},0', None),
+    ]
+
+
+def percentile(timings, fraction):
+    ordered = sorted(timings)
+    return ordered[max(int(round(fraction * len(ordered))) - 1, 0)]
+
+
+def git_commit():
+    try:
+        return subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], cwd=ROOT, capture_output=True,
+                              text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def setup(scale, random_seed, database_url=None, config=None):
+    """An app on a freshly seeded database: (app, venue_ids, artist_ids).
+
+    Uses ``database_url``, else DATABASE_URL, else a new SQLite file. The
+    tables are dropped and recreated.
+    """
+    database_url = database_url or os.environ.get('DATABASE_URL') or \
+        'sqlite:///' + os.path.join(tempfile.mkdtemp(), f'{scale}.db')
+    app = create_app(dict({'SQLALCHEMY_DATABASE_URI': database_url, 'RESPONSE_CACHE_ENABLED': False,
+                           'WTF_CSRF_ENABLED': False, 'EXPORT_TOKEN': EXPORT_TOKEN,
+                           'BULK_DELETE_TOKEN': EXPORT_TOKEN,
+                           'SLOW_QUERY_THRESHOLD_MS': None}, **(config or {})))
+    with app.app_context():
+        db.drop_all()
+        db.create_all()
+        started = time.perf_counter()
+        venue_ids, artist_ids, shows = seed(db.engine, db.metadata, scale, seed=random_seed)
+        print(f'{db.engine.dialect.name}: seeded {len(venue_ids)} venues, {len(artist_ids)} artists, '
+              f'{shows} shows in {time.perf_counter() - started:.1f}s')
+    return app, venue_ids, artist_ids
+
+
+def uncovered(app, cases):
+    covered = {endpoint for _, endpoint, _, _, _ in cases}
+    return sorted({rule.endpoint for rule in app.url_map.iter_rules()} - covered - {'static', 'dist'})
+
+
+def request(client, method, url, data):
+    """Issue one request and read the whole body; returns the SQL statements run."""
+    with count_queries() as statements:
+        response = client.open(url, method=method, data=data,
+                               headers={'Authorization': f'Bearer {EXPORT_TOKEN}'})
+        response.get_data()
+    if response.status_code >= 400:
+        raise RuntimeError(f'{method} {url} answered {response.status_code}')
+    return statements
+
+
+def run(app, cases, repeat, warmup):
+    results = {}
+    for name, _, method, path, data in cases:
+        client = app.test_client()
+        timings, queries = [], 0
+        for i in range(warmup + repeat):
+            url = path(i) if callable(path) else path
+            form = data(i) if callable(data) else data
+            started = time.perf_counter()
+            statements = request(client, method, url, form)
+            elapsed = (time.perf_counter() - started) * 1000
+            if i >= warmup:
+                timings.append(elapsed)
+                queries = max(queries, len(statements))
+
+        # A separate request under tracemalloc, which slows everything down.
+        url = path(warmup + repeat) if callable(path) else path
+        form = data(warmup + repeat) if callable(data) else data
+        tracemalloc.start()
+        request(client, method, url, form)
+        _, peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+
+        results[name] = {'p50_ms': percentile(timings, 0.5), 'p95_ms': percentile(timings, 0.95),
+                         'p99_ms': percentile(timings, 0.99), 'queries': queries,
+                         'peak_kib': peak / 1024}
+        print(f'{name:26} p50 {results[name]["p50_ms"]:8.2f}  p95 {results[name]["p95_ms"]:8.2f}  '
+              f'p99 {results[name]["p99_ms"]:8.2f} ms  {queries:3} queries  {peak / 1024:9.0f} KiB',
+              flush=True)
+    return results
+
+
+def compare(results, baseline):
+    print(f'\nCompared with {baseline["meta"]["commit"]} ({baseline["meta"]["date"]}):')
+    for name, current in results.items():
+        before = baseline['routes'].get(name)
+        if before is None:
+            print(f'{name:26} (new)')
+            continue
+        change = (current['p50_ms'] - before['p50_ms']) / before['p50_ms'] * 100 if before['p50_ms'] else 0
+        queries = current['queries'] - before['queries']
+        print(f'{name:26} p50 {before["p50_ms"]:8.2f} -> {current["p50_ms"]:8.2f} ms ({change:+6.1f}%)'
+              f'  queries {before["queries"]:3} -> {current["queries"]:3}'
+              f'{"  <-- more queries" if queries > 0 else ""}')
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--scale', choices=list(SCALES), default='1k')
+    parser.add_argument('--seed', type=int, default=1)
+    parser.add_argument('--repeat', type=int, default=30)
+    parser.add_argument('--warmup', type=int, default=2)
+    parser.add_argument('--cache', action='store_true', help='Leave the response cache on.')
+    parser.add_argument('--save', metavar='FILE', help='Write the results as a JSON baseline.')
+    parser.add_argument('--compare', metavar='FILE', help='Compare with a saved JSON baseline.')
+    args = parser.parse_args()
+
+    app, venue_ids, artist_ids = setup(args.scale, args.seed, config={'RESPONSE_CACHE_ENABLED': args.cache})
+    with app.app_context():
+        dialect = db.engine.dialect.name
+
+    benchmark_cases = cases(venue_ids, artist_ids)
+    missing = uncovered(app, benchmark_cases)
+    if missing:
+        print(f'Not benchmarked: {", ".join(missing)}', file=sys.stderr)
+
+    results = run(app, benchmark_cases, args.repeat, args.warmup)
+
+    if args.compare:
+        with open(args.compare) as f:
+            compare(results, json.load(f))
+    if args.save:
+        os.makedirs(os.path.dirname(os.path.abspath(args.save)), exist_ok=True)
+        with open(args.save, 'w') as f:
+            json.dump({'meta': {'scale': args.scale, 'seed': args.seed, 'repeat': args.repeat,
+                                'cache': args.cache, 'dialect': dialect, 'commit': git_commit(),
+                                'python': platform.python_version(),
+                                'date': datetime.now().isoformat(timespec='seconds')},
+                       'routes': results}, f, indent=2)
+        print(f'Saved baseline to {args.save}')
+
+
+if __name__ == '__main__':
+    main()
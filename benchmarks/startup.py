@@ -0,0 +1,66 @@
+"""Process startup cost.
+
+Each run starts a fresh interpreter and times importing ``app``, building the
+application with ``create_app()`` and serving the first request, counting
+the database connections opened along the way:
+
+    python benchmarks/startup.py --runs 20
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+PROBE = '''
+import json, sys, time
+from sqlalchemy import event
+from sqlalchemy.pool import Pool
+
+connections = []
+event.listen(Pool, 'connect', lambda *args: connections.append(1))
+
+started = time.perf_counter()
+import app
+imported = time.perf_counter()
+application = app.create_app()
+created = time.perf_counter()
+at_startup = len(connections)
+response = application.test_client().get(sys.argv[1])
+served = time.perf_counter()
+
+print(json.dumps({'import': imported - started, 'create_app': created - imported,
+                  'first_request': served - created, 'connections_at_startup': at_startup,
+                  'status': response.status_code}))
+'''
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--runs', type=int, default=10)
+    parser.add_argument('--path', default='/', help='URL of the first request.')
+    args = parser.parse_args()
+
+    env = dict(os.environ)
+    env.setdefault('DATABASE_URL', 'sqlite:///' + os.path.join(tempfile.mkdtemp(), 'startup.db'))
+
+    results = []
+    for _ in range(args.runs):
+        output = subprocess.run([sys.executable, '-c', PROBE, args.path], cwd=ROOT, env=env,
+                                check=True, capture_output=True, text=True).stdout
+        results.append(json.loads(output.splitlines()[-1]))
+
+    for phase in ['import', 'create_app', 'first_request']:
+        timings = [result[phase] * 1000 for result in results]
+        print(f'{phase:14} median {statistics.median(timings):8.2f} ms   max {max(timings):8.2f} ms')
+    print(f'connections opened before the first request: '
+          f'{max(result["connections_at_startup"] for result in results)}')
+    print(f'first request status: {results[-1]["status"]}')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,169 @@
+from datetime import timedelta
+
+from sqlalchemy import Column, DateTime, Integer, MetaData, Table, and_, select
+
+from counters import refresh_show_counts
+from ids import allocate_ids
+from listing import refresh_show_listing
+
+OWNERS = ('venue', 'artist')
+
+DEFAULT_DURATION = timedelta(hours=2)
+# Upper bound on a show's length. It turns "overlaps [start, end)" into a
+# range scan of the (venue_id, start_time) / (artist_id, start_time) indexes:
+# only shows starting within MAX_DURATION before ``start`` can reach into it.
+MAX_DURATION = timedelta(hours=12)
+
+
+def parse_duration(value):
+    """A show length from a number of minutes; blank means DEFAULT_DURATION.
+
+    Raises ValueError unless it is from one minute to MAX_DURATION.
+    """
+    if value is None or str(value).strip() == '':
+        return DEFAULT_DURATION
+    duration = timedelta(minutes=int(value))
+    if not timedelta(0) < duration <= MAX_DURATION:
+        raise ValueError(f'{value} minutes is not a valid duration')
+    return duration
+
+
+def overlapping(tables, owner, owner_id, start, end):
+    """Select the shows of one venue or artist that overlap ``[start, end)``."""
+    show = tables['show']
+    return select([show.c.id, show.c.start_time, show.c.end_time]) \
+        .where(and_(show.c[f'{owner}_id'] == owner_id,
+                    show.c.start_time > start - MAX_DURATION,
+                    show.c.start_time < end,
+                    show.c.end_time > start)) \
+        .order_by(show.c.start_time)
+
+
+def free_slots(busy, start, end):
+    """The gaps of ``[start, end)`` not covered by the (start, end) ``busy`` intervals."""
+    slots, cursor = [], start
+    for busy_start, busy_end in sorted(busy):
+        if busy_start > cursor:
+            slots.append((cursor, min(busy_start, end)))
+        cursor = max(cursor, busy_end)
+        if cursor >= end:
+            break
+    if cursor < end:
+        slots.append((cursor, end))
+    return slots
+
+
+def conflicts(connection, tables, venue_id, artist_id, start, end):
+    """Ids of stored shows that double-book the venue or the artist."""
+    ids = set()
+    for owner, owner_id in (('venue', venue_id), ('artist', artist_id)):
+        ids.update(row.id for row in connection.execute(overlapping(tables, owner, owner_id, start, end)))
+    return ids
+
+
+def conflicting_rows(connection, tables, rows):
+    """Positions in ``rows`` that overlap a stored show or an earlier row.
+
+    ``rows`` are show dicts with venue_id, artist_id, start_time and
+    end_time. The batch is written to a temporary table and joined with
+    ``show`` on the owner id and start-time window, one index range scan
+    per row, instead of one round trip per row. Callers that must not race
+    other writers lock the venue and artist rows first; on PostgreSQL the
+    exclusion constraints catch what slips through.
+    """
+    if not rows:
+        return set()
+    if len(rows) == 1:
+        # A single row cannot clash within the batch; two range scans beat the temporary table.
+        row = rows[0]
+        return {0} if conflicts(connection, tables, row['venue_id'], row['artist_id'],
+                                row['start_time'], row['end_time']) else set()
+
+    candidate = Table('booking_candidate', MetaData(),
+                      Column('position', Integer, primary_key=True),
+                      Column('venue_id', Integer), Column('artist_id', Integer),
+                      Column('window_start', DateTime(timezone=True)),
+                      Column('start_time', DateTime(timezone=True)),
+                      Column('end_time', DateTime(timezone=True)),
+                      prefixes=['TEMPORARY'])
+    candidate.create(connection)
+    connection.execute(candidate.insert(), [
+        {'position': position, 'venue_id': row['venue_id'], 'artist_id': row['artist_id'],
+         'window_start': row['start_time'] - MAX_DURATION, 'start_time': row['start_time'],
+         'end_time': row['end_time']} for position, row in enumerate(rows)])
+    rejected = set()
+    show = tables['show']
+    for owner in OWNERS:
+        overlaps = select([candidate.c.position]).distinct().select_from(candidate.join(show, and_(
+            show.c[f'{owner}_id'] == candidate.c[f'{owner}_id'],
+            show.c.start_time > candidate.c.window_start,
+            show.c.start_time < candidate.c.end_time,
+            show.c.end_time > candidate.c.start_time)))
+        rejected.update(row.position for row in connection.execute(overlaps))
+    # Dropped only on success, not in a finally: after an error the caller rolls
+    # back, which undoes the CREATE too, and on PostgreSQL a DROP in the failed
+    # transaction would itself fail and hide the original error.
+    candidate.drop(connection)
+
+    booked = {}
+    for position, row in enumerate(rows):
+        if position in rejected:
+            continue
+        keys = [(owner, row[f'{owner}_id']) for owner in OWNERS]
+        if any(start < row['end_time'] and end > row['start_time']
+               for key in keys for start, end in booked.get(key, ())):
+            rejected.add(position)
+            continue
+        for key in keys:
+            booked.setdefault(key, []).append((row['start_time'], row['end_time']))
+    return rejected
+
+
+def book(connection, tables, rows, now, insert=None):
+    """Insert the shows of ``rows`` that can be booked; returns (booked rows, errors).
+
+    ``rows`` are show dicts with venue_id, artist_id, start_time and
+    end_time. Their venue and artist rows are locked first, so concurrent
+    bookings of any of them are checked one at a time, and then checked for
+    existence with one ``IN`` query each. Rows naming a missing venue or
+    artist, or double-booking one, are left out and reported in ``errors``
+    as ``{position: {field: [message]}}``. The others get ids and go in
+    with one multi-row INSERT (or ``insert(table, rows)``, e.g. a COPY), and
+    their listing rows and show counts are refreshed in the same transaction.
+    """
+    if not rows:
+        return [], {}
+
+    errors, existing = {}, {}
+    for owner in OWNERS:
+        table = tables[owner]
+        ids = {row[f'{owner}_id'] for row in rows}
+        connection.execute(table.update().where(table.c.id.in_(ids))
+                           .values(version=table.c.version + 1, updated_at=now))
+        existing[owner] = {row.id for row in
+                           connection.execute(select([table.c.id]).where(table.c.id.in_(ids)))}
+    for position, row in enumerate(rows):
+        missing = {f'{owner}_id': [f'No such {owner}'] for owner in OWNERS
+                   if row[f'{owner}_id'] not in existing[owner]}
+        if missing:
+            errors[position] = missing
+
+    candidates = [position for position in range(len(rows)) if position not in errors]
+    for index in conflicting_rows(connection, tables, [rows[position] for position in candidates]):
+        errors[candidates[index]] = {'start_time': ['The venue or the artist is already booked then']}
+    booked = [row for position, row in enumerate(rows) if position not in errors]
+    if not booked:
+        return [], errors
+
+    show = tables['show']
+    # Ids are allocated so the listing rows of exactly these shows can be built.
+    for show_id, row in zip(allocate_ids(connection, show, len(booked)), booked):
+        row['id'] = show_id
+    if insert is not None:
+        insert(show, booked)
+    else:
+        connection.execute(show.insert().values([dict(row, updated_at=now) for row in booked]))
+    refresh_show_listing(connection, tables, show_ids=[row['id'] for row in booked])
+    for owner in OWNERS:
+        refresh_show_counts(connection, tables, owner, {row[f'{owner}_id'] for row in booked}, now)
+    return booked, errors
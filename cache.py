@@ -0,0 +1,263 @@
+import threading
+import time
+from collections import OrderedDict
+from functools import wraps
+
+from flask import current_app, g, request, session
+from werkzeug.utils import import_string
+
+from routing import replica_window
+
+
+class CacheBackend(object):
+    """Storage for rendered responses.
+
+    Entries carry tags so a write can drop every page that shows the entity
+    it touched. A backend shared between workers (Redis, memcached, ...)
+    implements the same five methods so invalidation reaches every process;
+    the in-process ``LRUBackend`` only sees writes made by its own worker,
+    and says so with ``shared = False``.
+    """
+
+    shared = True
+
+    def get(self, key):
+        raise NotImplementedError
+
+    def set(self, key, value, tags):
+        raise NotImplementedError
+
+    def invalidate(self, tags):
+        raise NotImplementedError
+
+    def invalidated_within(self, tags, seconds):
+        """Whether any of ``tags`` was invalidated in the last ``seconds``."""
+        raise NotImplementedError
+
+    def clear(self):
+        raise NotImplementedError
+
+    def info(self):
+        return {}
+
+
+class LRUBackend(CacheBackend):
+    """In-process LRU cache.
+
+    Invalidations are remembered for ``ttl`` seconds, which bounds the
+    windows :meth:`invalidated_within` can answer for.
+    """
+
+    shared = False
+
+    def __init__(self, max_entries=1024, max_bytes=64 * 1024 * 1024, ttl=300):
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.ttl = ttl
+        self._entries = OrderedDict()
+        self._tags = {}
+        self._invalidated = OrderedDict()
+        self._bytes = 0
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            expires_at, value, _, _ = entry
+            if expires_at < time.monotonic():
+                self._remove(key)
+                return None
+            self._entries.move_to_end(key)
+            return value
+
+    def set(self, key, value, tags):
+        size = len(value[2])
+        if size > self.max_bytes:
+            return
+        with self._lock:
+            if key in self._entries:
+                self._remove(key)
+            self._entries[key] = (time.monotonic() + self.ttl, value, tags, size)
+            self._bytes += size
+            for tag in tags:
+                self._tags.setdefault(tag, set()).add(key)
+            while len(self._entries) > self.max_entries or self._bytes > self.max_bytes:
+                self._remove(next(iter(self._entries)))
+
+    def invalidate(self, tags):
+        now = time.monotonic()
+        with self._lock:
+            for tag in tags:
+                for key in list(self._tags.get(tag, ())):
+                    self._remove(key)
+                self._invalidated.pop(tag, None)
+                self._invalidated[tag] = now
+            while self._invalidated and next(iter(self._invalidated.values())) < now - self.ttl:
+                self._invalidated.popitem(last=False)
+
+    def invalidated_within(self, tags, seconds):
+        since = time.monotonic() - seconds
+        with self._lock:
+            return any(self._invalidated.get(tag, since) > since for tag in tags)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._tags.clear()
+            self._invalidated.clear()
+            self._bytes = 0
+
+    def info(self):
+        return {'entries': len(self._entries), 'bytes': self._bytes,
+                'max_entries': self.max_entries, 'max_bytes': self.max_bytes, 'ttl': self.ttl}
+
+    def _remove(self, key):
+        _, _, tags, size = self._entries.pop(key)
+        self._bytes -= size
+        for tag in tags:
+            keys = self._tags.get(tag)
+            if keys is not None:
+                keys.discard(key)
+                if not keys:
+                    del self._tags[tag]
+
+
+class _ResponseCacheState(object):
+    """The cache of one application: its backend and hit counts."""
+
+    def __init__(self, backend, enabled):
+        self.backend = backend
+        self.enabled = enabled
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+
+    def count(self, hit):
+        with self._lock:
+            if hit:
+                self.hits += 1
+            else:
+                self.misses += 1
+
+
+class ResponseCache(object):
+    """Caches rendered GET responses per URL, tagged by route and entity.
+
+    Each application bound with :meth:`init_app` gets its own backend and
+    counters in ``app.extensions['response_cache']``; the methods act on
+    those of ``current_app``.
+    """
+
+    def __init__(self, app=None, backend=None):
+        self.backend = backend
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        app.config.setdefault('RESPONSE_CACHE_ENABLED', True)
+        app.config.setdefault('RESPONSE_CACHE_BACKEND', None)
+        app.config.setdefault('RESPONSE_CACHE_MAX_ENTRIES', 1024)
+        app.config.setdefault('RESPONSE_CACHE_MAX_BYTES', 64 * 1024 * 1024)
+        app.config.setdefault('RESPONSE_CACHE_TTL', 300)
+
+        backend = self.backend
+        if backend is None:
+            if app.config['RESPONSE_CACHE_BACKEND']:
+                backend = import_string(app.config['RESPONSE_CACHE_BACKEND'])(app)
+            else:
+                backend = LRUBackend(max_entries=app.config['RESPONSE_CACHE_MAX_ENTRIES'],
+                                     max_bytes=app.config['RESPONSE_CACHE_MAX_BYTES'],
+                                     ttl=app.config['RESPONSE_CACHE_TTL'])
+        app.extensions['response_cache'] = _ResponseCacheState(backend, app.config['RESPONSE_CACHE_ENABLED'])
+
+    @staticmethod
+    def _state():
+        return current_app.extensions['response_cache']
+
+    def cached(self, *tags):
+        """Serve the view from the cache, tagging the entry with ``tags``.
+
+        Tags are formatted with the view arguments, e.g. ``'venue:{venue_id}'``.
+        Views can add further tags while rendering with :meth:`tag`.
+        """
+        def decorator(view):
+            @wraps(view)
+            def wrapper(**kwargs):
+                state = self._state()
+                # Pending flashes are rendered into the page, so it is not shareable.
+                if not state.enabled or request.method != 'GET' or '_flashes' in session:
+                    return view(**kwargs)
+
+                key = f'{request.endpoint}:{request.full_path}'
+                value = state.backend.get(key)
+                if value is not None:
+                    state.count(hit=True)
+                    status, headers, body = value
+                    response = current_app.response_class(body, status=status, headers=headers)
+                    response.headers['X-Cache'] = 'HIT'
+                    return response
+
+                state.count(hit=False)
+                g.response_cache_tags = {tag.format(**kwargs) for tag in tags}
+                response = current_app.make_response(view(**kwargs))
+                response.headers['X-Cache'] = 'MISS'
+                if response.status_code == 200:
+                    self._store(state.backend, key, response, g.response_cache_tags, replica_window())
+                return response
+            return wrapper
+        return decorator
+
+    def tag(self, *tags):
+        if 'response_cache_tags' in g:
+            g.response_cache_tags.update(tags)
+
+    def invalidate(self, *tags):
+        self._state().backend.invalidate(tags)
+
+    @property
+    def shared(self):
+        """Whether invalidation here reaches the cache of every process."""
+        return self._state().backend.shared
+
+    def stats(self):
+        state = self._state()
+        lookups = state.hits + state.misses
+        stats = {'hits': state.hits, 'misses': state.misses,
+                 'hit_ratio': state.hits / lookups if lookups else None}
+        stats.update(state.backend.info())
+        return stats
+
+    @staticmethod
+    def _store(backend, key, response, tags, replica_window=0):
+        """Store ``response`` under ``key``, once its body is complete.
+
+        A page read from a replica less than ``replica_window`` seconds after
+        one of its tags was invalidated may predate that write, and is not
+        stored.
+        """
+        headers = [(name, value) for name, value in response.headers
+                   if name.lower() not in ('x-cache', 'set-cookie')]
+        tags = frozenset(tags)
+
+        def store(body):
+            if replica_window and backend.invalidated_within(tags, replica_window):
+                return
+            backend.set(key, (response.status_code, headers, body), tags)
+
+        if not response.is_streamed:
+            store(response.get_data())
+            return
+
+        # Tee a streamed body and store it once the client has received all of it.
+        chunks = response.iter_encoded()
+
+        def generate():
+            body = []
+            for chunk in chunks:
+                body.append(chunk)
+                yield chunk
+            store(b''.join(body))
+
+        response.response = generate()
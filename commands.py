@@ -0,0 +1,166 @@
+import json
+import os
+import time
+
+import click
+from flask import current_app
+from flask.cli import with_appcontext
+
+import assets
+import exporter
+from counters import roll_shows
+from extensions import db, response_cache
+from importer import FORMATS, Importer, read_rows
+from models import utc_now
+from seed import SCALES, seed
+
+
+def invalidate_cache(*tags):
+    """Drop cached pages after a write made from the command line.
+
+    The in-process cache of the web workers is out of reach from here, so
+    without a shared RESPONSE_CACHE_BACKEND they keep serving their copies
+    until RESPONSE_CACHE_TTL runs out, which is reported as a warning.
+    """
+    response_cache.invalidate(*tags)
+    if current_app.config['RESPONSE_CACHE_ENABLED'] and not response_cache.shared:
+        click.echo(f"Warning: the response cache is per process. Running web workers keep serving cached "
+                   f"pages for up to {current_app.config['RESPONSE_CACHE_TTL']}s; set "
+                   f"RESPONSE_CACHE_BACKEND to a shared backend, or restart them.", err=True)
+
+
+@click.command('create-db')
+@with_appcontext
+def create_db_command():
+    """Create the configured database if it does not exist yet."""
+    # Imported here so the app itself never pays for sqlalchemy_utils.
+    from sqlalchemy_utils import create_database, database_exists
+
+    url = db.engine.url
+    if database_exists(url):
+        click.echo(f'Database {url.database} already exists')
+        return
+    create_database(url)
+    click.echo(f'Created database {url.database}')
+
+
+@click.command('import')
+@with_appcontext
+@click.argument('kind', type=click.Choice(['venues', 'artists', 'shows']))
+@click.argument('source', type=click.Path(exists=True, dir_okay=False))
+@click.option('--format', 'fmt', type=click.Choice(FORMATS),
+              help='Input format; defaults to the file extension.')
+@click.option('--batch-size', default=5000, show_default=True, help='Rows per transaction.')
+@click.option('--checkpoint',
+              help='Name to record committed rows under; an interrupted import resumes from it.')
+@click.option('--errors', 'errors_file', type=click.File('w'),
+              help='Write rejected rows with their validation errors here as NDJSON.')
+def import_command(kind, source, fmt, batch_size, checkpoint, errors_file):
+    """Bulk-load venues, artists or shows from a CSV or NDJSON file."""
+    fmt = fmt or ('ndjson' if source.endswith(('.ndjson', '.jsonl')) else 'csv')
+    importer = Importer(db.engine, db.metadata, kind)
+    progress = importer.checkpoint(checkpoint, source)
+    if progress.rows:
+        click.echo(f'Resuming after {progress.rows} rows')
+
+    def on_batch(consumed, inserted, rejected, elapsed):
+        click.echo(f'{consumed} rows read, {inserted} inserted, {rejected} rejected, '
+                   f'{inserted / elapsed:,.0f} rows/s')
+
+    def on_reject(line, row, errors):
+        if errors_file:
+            errors_file.write(json.dumps({'row': line, 'data': row, 'errors': errors}, default=str) + '\n')
+
+    with open(source, newline='') as stream:
+        inserted, rejected, elapsed = importer.run(read_rows(stream, fmt), batch_size, progress,
+                                                   on_batch=on_batch, on_reject=on_reject)
+    progress.clear()
+    invalidate_cache(kind, *(['venues'] if kind == 'shows' else []), *importer.touched)
+
+    click.echo(f'Imported {inserted} {kind} in {elapsed:.1f}s '
+               f'({inserted / elapsed if elapsed else 0:,.0f} rows/s), {rejected} rejected')
+    if rejected and not errors_file:
+        click.echo('Pass --errors FILE to keep the rejected rows.', err=True)
+
+
+@click.command('export')
+@with_appcontext
+@click.argument('kind', type=click.Choice(exporter.KINDS))
+@click.option('--output', '-o', type=click.Path(dir_okay=False),
+              help='Output file; gzip-compressed when it ends in .gz. Defaults to stdout.')
+@click.option('--format', 'fmt', type=click.Choice(exporter.FORMATS), default='csv', show_default=True)
+@click.option('--since', help='Only rows changed at or after this ISO-8601 timestamp.')
+@click.option('--batch-size', default=1000, show_default=True, help='Rows fetched per round trip.')
+def export_command(kind, output, fmt, since, batch_size):
+    """Stream venues, artists or shows to CSV or NDJSON."""
+    try:
+        since = exporter.parse_since(since) if since else None
+    except ValueError:
+        raise click.BadParameter(f'{since!r} is not an ISO-8601 timestamp', param_hint='--since')
+
+    chunks = exporter.export_chunks(db.engine, db.metadata, kind, fmt, since=since, batch_size=batch_size)
+    if output is None:
+        for chunk in chunks:
+            click.echo(chunk, nl=False)
+        return
+    if output.endswith('.gz'):
+        with open(output, 'wb') as f:
+            for chunk in exporter.gzip_chunks(chunks, current_app.config['EXPORT_GZIP_LEVEL']):
+                f.write(chunk)
+    else:
+        with open(output, 'w', newline='') as f:
+            for chunk in chunks:
+                f.write(chunk)
+
+
+@click.command('roll-shows')
+@with_appcontext
+def roll_shows_command():
+    """Move shows that have started from the upcoming to the past counts.
+
+    Run it every few minutes (cron, systemd timer); until then a show that
+    has started is still counted as upcoming on the listing pages.
+    """
+    with db.engine.begin() as connection:
+        rolled = roll_shows(connection, db.metadata.tables, utc_now())
+    if any(rolled.values()):
+        invalidate_cache('venues', 'artists')
+    click.echo(f"Rolled {rolled['venue']} venues and {rolled['artist']} artists")
+
+
+@click.command('seed')
+@with_appcontext
+@click.option('--scale', type=click.Choice(list(SCALES)), default='1k', show_default=True,
+              help='Catalog size, named by its number of shows.')
+@click.option('--seed', 'random_seed', default=1, show_default=True, help='Random seed.')
+@click.option('--batch-size', default=5000, show_default=True, help='Rows per transaction.')
+def seed_command(scale, random_seed, batch_size):
+    """Add a reproducible synthetic catalog of venues, artists and shows."""
+    venues, artists, shows = SCALES[scale]
+    click.echo(f'Generating {venues} venues, {artists} artists and {shows} shows (seed {random_seed})')
+    started = time.perf_counter()
+
+    def on_batch(consumed, inserted, rejected, elapsed):
+        click.echo(f'  {inserted} rows, {inserted / elapsed:,.0f} rows/s')
+
+    seed(db.engine, db.metadata, scale, seed=random_seed, batch_size=batch_size, on_batch=on_batch)
+    invalidate_cache('venues', 'artists', 'shows')
+    click.echo(f'Seeded in {time.perf_counter() - started:.1f}s')
+
+
+@click.group('assets')
+def assets_command():
+    """Static asset bundles."""
+
+
+@assets_command.command('build')
+@with_appcontext
+def assets_build_command():
+    """Bundle and minify the CSS and JS into hashed, precompressed files."""
+    dist_folder = current_app.config['ASSETS_DIST_FOLDER']
+    manifest = assets.build(current_app.static_folder, dist_folder)
+    for name, filename in manifest.items():
+        size = os.path.getsize(os.path.join(dist_folder, filename))
+        gzipped = os.path.getsize(os.path.join(dist_folder, filename + '.gz'))
+        click.echo(f'{name:10} -> {filename}  {size:,} bytes, {gzipped:,} gzipped')
+    click.echo(f'Wrote {dist_folder}/{assets.MANIFEST}')
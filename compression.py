@@ -0,0 +1,144 @@
+import zlib
+
+from flask import current_app, request
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+COMPRESSIBLE_MIMETYPES = ('text/html', 'text/css', 'text/csv', 'text/plain', 'text/xml',
+                          'application/json', 'application/x-ndjson', 'application/javascript',
+                          'application/xml', 'image/svg+xml')
+
+
+class GzipEncoder(object):
+    def __init__(self, level):
+        self._compressor = zlib.compressobj(level, zlib.DEFLATED, 16 + zlib.MAX_WBITS)
+
+    def compress(self, data):
+        return self._compressor.compress(data)
+
+    def flush(self):
+        return self._compressor.flush(zlib.Z_SYNC_FLUSH)
+
+    def finish(self):
+        return self._compressor.flush()
+
+
+class BrotliEncoder(object):
+    def __init__(self, quality):
+        self._compressor = brotli.Compressor(quality=quality)
+
+    def compress(self, data):
+        return self._compressor.process(data)
+
+    def flush(self):
+        return self._compressor.flush()
+
+    def finish(self):
+        return self._compressor.finish()
+
+
+def negotiate(accept_encodings, brotli_available):
+    """The coding to use for a client, or None: the highest q, brotli on a tie."""
+    offered = ['br', 'gzip'] if brotli_available else ['gzip']
+    best, best_quality = None, 0
+    for encoding in offered:
+        quality = accept_encodings[encoding]
+        if quality > best_quality:
+            best, best_quality = encoding, quality
+    return best
+
+
+def encode_chunks(body, encoder, flush_size, charset='utf-8'):
+    """Compress a response body iterable as it is consumed.
+
+    Output is flushed once ``flush_size`` input bytes have gone in since
+    the last flush, so a streamed page still reaches the client in pieces
+    while tiny template chunks are compressed together.
+    """
+    pending = 0
+    try:
+        for chunk in body:
+            if isinstance(chunk, str):
+                chunk = chunk.encode(charset)
+            data = encoder.compress(chunk)
+            pending += len(chunk)
+            if pending >= flush_size:
+                data += encoder.flush()
+                pending = 0
+            if data:
+                yield data
+        yield encoder.finish()
+    finally:
+        # The original iterable may be a stream_with_context generator
+        # holding the request context open.
+        close = getattr(body, 'close', None)
+        if close is not None:
+            close()
+
+
+class Compression(object):
+    """gzip or brotli ``Content-Encoding`` for the app's responses.
+
+    The coding follows ``Accept-Encoding``. Buffered bodies under
+    ``COMPRESS_MIN_SIZE`` bytes and types outside ``COMPRESS_MIMETYPES`` go
+    out as they are, as do responses that already carry a
+    ``Content-Encoding`` (the export, the prebuilt asset bundles) and files
+    sent with ``send_file``. Streamed bodies are compressed as they are
+    generated, never held whole.
+    """
+
+    def __init__(self, app=None):
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        app.config.setdefault('COMPRESS_ENABLED', True)
+        app.config.setdefault('COMPRESS_LEVEL', 6)
+        app.config.setdefault('COMPRESS_BROTLI_QUALITY', 4)
+        app.config.setdefault('COMPRESS_MIN_SIZE', 500)
+        app.config.setdefault('COMPRESS_STREAM_FLUSH_SIZE', 8192)
+        app.config.setdefault('COMPRESS_MIMETYPES', COMPRESSIBLE_MIMETYPES)
+
+        if app.config['COMPRESS_ENABLED']:
+            app.after_request(self._compress)
+        app.extensions['compression'] = self
+
+    @staticmethod
+    def _compress(response):
+        config = current_app.config
+        if response.mimetype not in config['COMPRESS_MIMETYPES'] or request.method == 'HEAD' \
+                or response.status_code < 200 or response.status_code in (204, 304) \
+                or 'Content-Encoding' in response.headers or response.direct_passthrough \
+                or response.cache_control.no_transform:
+            return response
+
+        response.vary.add('Accept-Encoding')
+        encoding = negotiate(request.accept_encodings, brotli is not None)
+        if encoding is None:
+            return response
+        if not response.is_streamed and response.content_length is not None \
+                and response.content_length < config['COMPRESS_MIN_SIZE']:
+            return response
+
+        if encoding == 'br':
+            encoder = BrotliEncoder(config['COMPRESS_BROTLI_QUALITY'])
+        else:
+            encoder = GzipEncoder(config['COMPRESS_LEVEL'])
+
+        if response.is_streamed:
+            response.response = encode_chunks(response.response, encoder,
+                                              config['COMPRESS_STREAM_FLUSH_SIZE'], response.charset)
+            response.headers.pop('Content-Length', None)
+        else:
+            response.set_data(encoder.compress(response.get_data()) + encoder.finish())
+
+        response.headers['Content-Encoding'] = encoding
+        # The compressed bytes differ from the identity ones, so a strong
+        # validator no longer holds; weak ones stay valid across codings.
+        etag, weak = response.get_etag()
+        if etag is not None and not weak:
+            response.set_etag(etag, weak=True)
+        return response
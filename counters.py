@@ -0,0 +1,43 @@
+from sqlalchemy import and_, func, select
+
+OWNERS = ('venue', 'artist')
+
+
+def refresh_show_counts(connection, tables, owner, ids, now, bump_version=False):
+    """Recompute the show counters of the ``owner`` rows in ``ids``.
+
+    ``connection`` may be a Connection or a Session; ``ids`` a list or a
+    select of ids. Callers run this after writing the shows, in the same
+    transaction, and after the owner rows were locked by their version
+    bump, so concurrent writers to the same venue or artist serialize and
+    each recount sees the other's committed shows.
+    """
+    table = tables[owner]
+    show = tables['show']
+    belongs = show.c[f'{owner}_id'] == table.c.id
+    upcoming = and_(belongs, show.c.start_time >= now)
+    values = {
+        'upcoming_shows_count': select([func.count(show.c.id)]).where(upcoming).as_scalar(),
+        'past_shows_count': select([func.count(show.c.id)])
+            .where(and_(belongs, show.c.start_time < now)).as_scalar(),
+        'next_show_time': select([func.min(show.c.start_time)]).where(upcoming).as_scalar(),
+    }
+    if bump_version:
+        values['version'] = table.c.version + 1
+    return connection.execute(table.update().where(table.c.id.in_(ids)).values(**values)).rowcount
+
+
+def roll_shows(connection, tables, now):
+    """Move shows that have started since the last roll from upcoming to past.
+
+    Only rows whose ``next_show_time`` has passed can be out of date, so
+    the index on that column finds them. Their version is bumped so cached
+    pages and ETags pick up the new counts. Returns the rows updated per
+    owner table.
+    """
+    rolled = {}
+    for owner in OWNERS:
+        table = tables[owner]
+        due = select([table.c.id]).where(table.c.next_show_time < now)
+        rolled[owner] = refresh_show_counts(connection, tables, owner, due, now, bump_version=True)
+    return rolled
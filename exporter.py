@@ -0,0 +1,123 @@
+import csv
+import io
+import json
+import zlib
+from datetime import datetime
+
+from pytz import utc
+from sqlalchemy import select
+
+KINDS = ('venues', 'artists', 'shows')
+FORMATS = ('csv', 'ndjson')
+
+COLUMNS = {
+    'venues': ['id', 'name', 'city', 'state', 'address', 'phone', 'image_link', 'facebook_link',
+               'website', 'seeking_talent', 'updated_at'],
+    'artists': ['id', 'name', 'city', 'state', 'phone', 'image_link', 'facebook_link',
+                'website', 'seeking_venue', 'updated_at'],
+    'shows': ['id', 'venue_id', 'artist_id', 'start_time', 'end_time', 'updated_at'],
+}
+
+
+class Exporter(object):
+    """Reads one table as plain column tuples through a server-side cursor.
+
+    With ``since`` only rows whose ``updated_at`` is at or after it are
+    exported. Deleted rows are not reported by incremental exports.
+    """
+
+    def __init__(self, metadata, kind, since=None, batch_size=1000):
+        self.tables = metadata.tables
+        self.kind = kind
+        self.since = since
+        self.batch_size = batch_size
+        self.owner = kind[:-1]
+        self.fields = COLUMNS[kind] + (['genres'] if kind != 'shows' else [])
+
+    def batches(self, connection):
+        table = self.tables[self.owner]
+        query = select([table.c[name] for name in COLUMNS[self.kind]]).order_by(table.c.id)
+        if self.since is not None:
+            query = query.where(table.c.updated_at >= self.since)
+
+        result = connection.execution_options(stream_results=True).execute(query)
+        try:
+            while True:
+                rows = result.fetchmany(self.batch_size)
+                if not rows:
+                    break
+                batch = [dict(row) for row in rows]
+                if self.kind != 'shows':
+                    self._attach_genres(connection, batch)
+                yield batch
+        finally:
+            result.close()
+
+    def _attach_genres(self, connection, batch):
+        genre = self.tables['genre']
+        association = self.tables[f'{self.owner}_genre']
+        owner_id = association.c[f'{self.owner}_id']
+        names = {}
+        rows = connection.execute(
+            select([owner_id, genre.c.name])
+            .select_from(association.join(genre, genre.c.id == association.c.genre_id))
+            .where(owner_id.in_([row['id'] for row in batch]))
+            .order_by(owner_id, genre.c.name))
+        for row_owner_id, name in rows:
+            names.setdefault(row_owner_id, []).append(name)
+        for row in batch:
+            row['genres'] = names.get(row['id'], [])
+
+
+def parse_since(value):
+    """An ISO 8601 time as UTC; naive times are taken to be UTC already.
+
+    SQLite stores times as UTC text without an offset and compares them as
+    text, so a time is only comparable there once it is in UTC.
+    """
+    since = datetime.fromisoformat(value)
+    return since.astimezone(utc) if since.tzinfo is not None else utc.localize(since)
+
+
+def export_value(value):
+    return value.isoformat() if isinstance(value, datetime) else value
+
+
+def csv_chunks(fields, batches):
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow(fields)
+    for batch in batches:
+        for row in batch:
+            writer.writerow([','.join(row[name]) if name == 'genres' else export_value(row[name])
+                             for name in fields])
+        yield buffer.getvalue()
+        buffer.seek(0)
+        buffer.truncate()
+    yield buffer.getvalue()
+
+
+def ndjson_chunks(fields, batches):
+    for batch in batches:
+        yield ''.join(json.dumps({name: export_value(row[name]) for name in fields}) + '\n'
+                      for row in batch)
+
+
+def gzip_chunks(chunks, level=6):
+    compressor = zlib.compressobj(level, zlib.DEFLATED, 16 + zlib.MAX_WBITS)
+    for chunk in chunks:
+        data = compressor.compress(chunk.encode('utf-8'))
+        if data:
+            yield data
+    yield compressor.flush()
+
+
+def export_chunks(engine, metadata, kind, fmt, since=None, batch_size=1000):
+    """Text chunks of the whole export, holding one batch in memory at a time."""
+    exporter = Exporter(metadata, kind, since=since, batch_size=batch_size)
+    with engine.connect() as connection:
+        batches = exporter.batches(connection)
+        if fmt == 'csv':
+            yield from csv_chunks(exporter.fields, batches)
+        else:
+            yield from ndjson_chunks(exporter.fields, batches)
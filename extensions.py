@@ -0,0 +1,19 @@
+from flask_migrate import Migrate
+from flask_moment import Moment
+
+from assets import Assets
+from cache import ResponseCache
+from compression import Compression
+from instrumentation import Instrumentation
+from metrics import Metrics
+from routing import RoutingSQLAlchemy
+
+# Created unbound; create_app() attaches them to an application.
+assets = Assets()
+compression = Compression()
+db = RoutingSQLAlchemy()
+instrumentation = Instrumentation()
+metrics = Metrics()
+migrate = Migrate()
+moment = Moment()
+response_cache = ResponseCache()
@@ -1,8 +1,11 @@
-from datetime import datetime
+from datetime import datetime, timedelta
 from flask_wtf import FlaskForm
 from sqlalchemy import Enum
-from wtforms import StringField, SelectField, SelectMultipleField, DateTimeField, BooleanField
-from wtforms.validators import DataRequired, AnyOf, URL
+from wtforms import StringField, SelectField, SelectMultipleField, DateTimeField, BooleanField, IntegerField, \
+    TextAreaField
+from wtforms.validators import DataRequired, AnyOf, URL, NumberRange, Optional
+
+from booking import DEFAULT_DURATION, MAX_DURATION
 
 class ShowForm(FlaskForm):
     artist_id = StringField(
@@ -16,6 +19,18 @@ class ShowForm(FlaskForm):
         validators=[DataRequired()],
         default=datetime.today()
     )
+    duration = IntegerField(
+        'duration',
+        validators=[Optional(), NumberRange(min=1, max=MAX_DURATION // timedelta(minutes=1))],
+        default=DEFAULT_DURATION // timedelta(minutes=1)
+    )
+
+
+class ShowBatchForm(FlaskForm):
+    # One "artist_id, venue_id, start_time[, duration]" line per show
+    shows = TextAreaField(
+        'shows', validators=[DataRequired()]
+    )
 
 
 class VenueForm(FlaskForm):
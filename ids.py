@@ -0,0 +1,17 @@
+from sqlalchemy import func, select, text
+
+
+def allocate_ids(connection, table, count):
+    """Reserve ``count`` primary keys of ``table`` before inserting rows.
+
+    Ids are assigned up front so child rows (genres, listing rows) can
+    reference them without RETURNING. Outside PostgreSQL this assumes a
+    single writer, e.g. one holding the database's write lock.
+    """
+    if connection.dialect.name == 'postgresql':
+        rows = connection.execute(
+            text("SELECT nextval(pg_get_serial_sequence(:table, 'id')) FROM generate_series(1, :count)"),
+            table=table.name, count=count)
+        return [row[0] for row in rows]
+    start = (connection.execute(select([func.max(table.c.id)])).scalar() or 0) + 1
+    return list(range(start, start + count))
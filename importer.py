@@ -0,0 +1,323 @@
+import csv
+import io
+import json
+import os
+import time
+from datetime import datetime, timedelta
+from itertools import islice
+
+from pytz import utc
+from sqlalchemy import and_, select
+from werkzeug.datastructures import MultiDict
+
+from booking import DEFAULT_DURATION, book
+from forms import ArtistForm, ShowForm, VenueForm
+from ids import allocate_ids
+
+FORMATS = ('csv', 'ndjson')
+TRUE_VALUES = ('1', 'y', 'yes', 'true', 't', 'on')
+
+
+def read_rows(stream, fmt):
+    if fmt == 'csv':
+        yield from csv.DictReader(stream)
+    else:
+        for line in stream:
+            if line.strip():
+                yield json.loads(line)
+
+
+def chunked(iterable, size):
+    iterator = iter(iterable)
+    while True:
+        chunk = list(islice(iterator, size))
+        if not chunk:
+            return
+        yield chunk
+
+
+def as_list(value):
+    if value is None:
+        return []
+    if isinstance(value, str):
+        return [item.strip() for item in value.split(',') if item.strip()]
+    return list(value)
+
+
+def as_flag(value):
+    if isinstance(value, bool):
+        return value
+    return str(value or '').strip().lower() in TRUE_VALUES
+
+
+def parse_start_time(value):
+    value = datetime.fromisoformat(str(value).strip())
+    return value if value.tzinfo is not None else utc.localize(value)
+
+
+def duration_minutes(start_time, end_time):
+    """The minutes from ``start_time`` to ``end_time``, as form data.
+
+    Anything but a whole number of minutes is passed on as is, for the form
+    to reject.
+    """
+    try:
+        minutes, rest = divmod(parse_start_time(end_time) - parse_start_time(start_time), timedelta(minutes=1))
+    except ValueError:
+        return str(end_time)
+    return str(minutes) if not rest else f'{start_time} to {end_time}'
+
+
+def copy_field(value):
+    """``value`` as a field of COPY's CSV format.
+
+    NULL is the one unquoted empty field; everything else but numbers is
+    quoted, so an empty string stays an empty string.
+    """
+    if value is None:
+        return ''
+    if isinstance(value, (int, float)):
+        return str(value)
+    return '"' + str(value).replace('"', '""') + '"'
+
+
+class Checkpoint(object):
+    """Number of input rows already committed for one source file.
+
+    Named checkpoints are kept in the ``import_checkpoint`` table and
+    advanced in the transaction that loads each batch, so they always agree
+    with the rows in the database. Without a name nothing is recorded.
+    """
+
+    def __init__(self, engine, table, name, source, kind):
+        self.engine = engine
+        self.table = table
+        self.name = name
+        self.key = {'name': name, 'source': os.path.abspath(source), 'kind': kind}
+        self.rows = 0
+        if name:
+            with engine.connect() as connection:
+                self.rows = connection.execute(select([table.c.rows]).where(self._where())).scalar() or 0
+
+    def _where(self):
+        return and_(*(self.table.c[column] == value for column, value in self.key.items()))
+
+    def save(self, connection, rows):
+        self.rows = rows
+        if not self.name:
+            return
+        if not connection.execute(self.table.update().where(self._where()).values(rows=rows)).rowcount:
+            connection.execute(self.table.insert().values(rows=rows, **self.key))
+
+    def clear(self):
+        if self.name:
+            with self.engine.begin() as connection:
+                connection.execute(self.table.delete().where(self._where()))
+
+
+class BulkWriter(object):
+    """Batch inserts on one connection: COPY on PostgreSQL, executemany elsewhere."""
+
+    def __init__(self, connection):
+        self.connection = connection
+        self.dialect_name = connection.dialect.name
+
+    def allocate_ids(self, table, count):
+        return allocate_ids(self.connection, table, count)
+
+    def insert(self, table, rows):
+        if not rows:
+            return
+        if self.dialect_name != 'postgresql':
+            self.connection.execute(table.insert(), rows)
+            return
+
+        columns = list(rows[0])
+        buffer = io.StringIO(''.join(','.join(copy_field(row[column]) for column in columns) + '\n'
+                                     for row in rows))
+
+        quote = self.connection.dialect.identifier_preparer.quote
+        statement = f"COPY {quote(table.name)} ({', '.join(quote(c) for c in columns)}) " \
+                    f"FROM STDIN WITH (FORMAT csv)"
+        cursor = self.connection.connection.cursor()
+        try:
+            cursor.copy_expert(statement, buffer)
+        finally:
+            cursor.close()
+
+
+class Importer(object):
+    """Validates and loads venue, artist or show rows in batches.
+
+    Rows are checked with the same forms as the web handlers. Each batch is
+    inserted and committed in its own transaction, together with the
+    checkpoint, so an interrupted import can resume where it stopped.
+    """
+
+    forms = {'venues': VenueForm, 'artists': ArtistForm, 'shows': ShowForm}
+
+    def __init__(self, engine, metadata, kind):
+        self.engine = engine
+        self.tables = metadata.tables
+        self.kind = kind
+        # Cache tags of the venue/artist pages affected by imported shows.
+        self.touched = set()
+
+    def checkpoint(self, name, source):
+        return Checkpoint(self.engine, self.tables['import_checkpoint'], name, source, self.kind)
+
+    def validate(self, row):
+        formdata = MultiDict()
+        for name, value in row.items():
+            if name == 'genres':
+                formdata.setlist(name, as_list(value))
+            elif name in ('seeking_artist', 'seeking_talent', 'seeking_venue'):
+                if as_flag(value):
+                    formdata[name if name != 'seeking_talent' else 'seeking_artist'] = 'y'
+            elif name == 'start_time' and value:
+                try:
+                    formdata[name] = parse_start_time(value).strftime('%Y-%m-%d %H:%M:%S')
+                except ValueError:
+                    formdata[name] = str(value)
+            elif value is not None:
+                formdata[name] = str(value)
+
+        if self.kind == 'shows':
+            # Exports give the end time rather than the duration.
+            if not formdata.get('duration') and row.get('start_time') and row.get('end_time'):
+                formdata['duration'] = duration_minutes(row['start_time'], row['end_time'])
+            # Shows may reference their venue and artist by name instead of id.
+            for owner in ('venue', 'artist'):
+                if not formdata.get(f'{owner}_id') and formdata.get(f'{owner}_name'):
+                    formdata[f'{owner}_id'] = formdata[f'{owner}_name']
+
+        form = self.forms[self.kind](formdata=formdata, meta={'csrf': False})
+        if not form.validate():
+            return None, form.errors
+        return form.data, None
+
+    def run(self, rows, batch_size, checkpoint, on_batch=None, on_reject=None):
+        """Import ``rows``; returns (inserted, rejected, seconds)."""
+        started = time.perf_counter()
+        consumed, inserted, rejected = checkpoint.rows, 0, 0
+
+        for batch in chunked(islice(rows, checkpoint.rows, None), batch_size):
+            valid = []
+            for line, row in enumerate(batch, start=consumed + 1):
+                data, errors = self.validate(row)
+                if errors:
+                    rejected += 1
+                    if on_reject:
+                        on_reject(line, row, errors)
+                else:
+                    valid.append((line, row, data))
+
+            with self.engine.begin() as connection:
+                loaded, errors = getattr(self, f'_load_{self.kind}')(BulkWriter(connection), valid)
+                checkpoint.save(connection, consumed + len(batch))
+            for line, row, message in errors:
+                rejected += 1
+                if on_reject:
+                    on_reject(line, row, message)
+
+            consumed += len(batch)
+            inserted += loaded
+            if on_batch:
+                on_batch(consumed, inserted, rejected, time.perf_counter() - started)
+
+        return inserted, rejected, time.perf_counter() - started
+
+    def _genre_ids(self, writer, names):
+        genre = self.tables['genre']
+        if not names:
+            return {}
+        existing = dict(writer.connection.execute(
+            select([genre.c.name, genre.c.id]).where(genre.c.name.in_(names))).fetchall())
+        missing = sorted(set(names) - set(existing))
+        if missing:
+            writer.connection.execute(genre.insert(), [{'name': name} for name in missing])
+            existing.update(writer.connection.execute(
+                select([genre.c.name, genre.c.id]).where(genre.c.name.in_(missing))).fetchall())
+        return existing
+
+    def _load_owners(self, writer, valid, owner, columns):
+        table = self.tables[owner]
+        association = self.tables[f'{owner}_genre']
+        ids = writer.allocate_ids(table, len(valid))
+        now = utc.localize(datetime.now())
+
+        rows, memberships = [], []
+        for owner_id, (_, _, data) in zip(ids, valid):
+            row = {'id': owner_id, 'version': 1, 'updated_at': now}
+            row.update((column, data[field]) for column, field in columns.items())
+            rows.append(row)
+            memberships.extend((owner_id, name) for name in dict.fromkeys(data['genres']))
+
+        writer.insert(table, rows)
+        genre_ids = self._genre_ids(writer, {name for _, name in memberships})
+        writer.insert(association, [{'genre_id': genre_ids[name], f'{owner}_id': owner_id}
+                                    for owner_id, name in memberships])
+        return len(rows), []
+
+    def _load_venues(self, writer, valid):
+        return self._load_owners(writer, valid, 'venue', {
+            'name': 'name', 'city': 'city', 'state': 'state', 'address': 'address',
+            'phone': 'phone', 'image_link': 'image_link', 'facebook_link': 'facebook_link',
+            'website': 'website', 'seeking_talent': 'seeking_artist'})
+
+    def _load_artists(self, writer, valid):
+        return self._load_owners(writer, valid, 'artist', {
+            'name': 'name', 'city': 'city', 'state': 'state', 'phone': 'phone',
+            'image_link': 'image_link', 'facebook_link': 'facebook_link',
+            'website': 'website', 'seeking_venue': 'seeking_venue'})
+
+    def _resolve(self, writer, owner, valid):
+        """Map each row's venue/artist reference (id or exact name) to an id."""
+        table = self.tables[owner]
+        refs = {self._reference(row, owner) for _, row, _ in valid}
+        ids = {ref for ref in refs if ref.isdigit()}
+        names = refs - ids
+
+        resolved = {}
+        if ids:
+            rows = writer.connection.execute(
+                select([table.c.id]).where(table.c.id.in_([int(ref) for ref in ids])))
+            resolved.update((str(row.id), row.id) for row in rows)
+        if names:
+            matches = {}
+            rows = writer.connection.execute(
+                select([table.c.name, table.c.id]).where(table.c.name.in_(names)))
+            for row in rows:
+                matches.setdefault(row.name, []).append(row.id)
+            resolved.update((name, ids[0]) for name, ids in matches.items() if len(ids) == 1)
+        return resolved
+
+    @staticmethod
+    def _reference(row, owner):
+        return str(row.get(f'{owner}_id') or row.get(f'{owner}_name') or '').strip()
+
+    def _load_shows(self, writer, valid):
+        venues = self._resolve(writer, 'venue', valid)
+        artists = self._resolve(writer, 'artist', valid)
+
+        rows, lines, errors = [], [], []
+        for line, row, data in valid:
+            venue_id = venues.get(self._reference(row, 'venue'))
+            artist_id = artists.get(self._reference(row, 'artist'))
+            if venue_id is None or artist_id is None:
+                errors.append((line, row, {'reference': ['Unknown or ambiguous venue/artist']}))
+                continue
+            start_time = parse_start_time(row['start_time'])
+            duration = timedelta(minutes=data['duration']) if data.get('duration') else DEFAULT_DURATION
+            rows.append({'venue_id': venue_id, 'artist_id': artist_id, 'start_time': start_time,
+                         'end_time': start_time + duration})
+            lines.append((line, row))
+
+        rows, rejected = book(writer.connection, self.tables, rows, utc.localize(datetime.now()),
+                              insert=writer.insert)
+        for position in sorted(rejected):
+            line, row = lines[position]
+            errors.append((line, row, rejected[position]))
+        for row in rows:
+            self.touched.update((f"venue:{row['venue_id']}", f"artist:{row['artist_id']}"))
+        return len(rows), errors
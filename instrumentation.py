@@ -0,0 +1,169 @@
+import time
+from contextlib import contextmanager
+
+from flask import current_app, g, has_app_context, has_request_context, request
+from jinja2 import Template
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+from sqlalchemy.pool import QueuePool
+
+
+class RequestStats(object):
+    """Database and template work done while serving one request."""
+
+    __slots__ = ('started', 'queries', 'db_time', 'render_time', 'pool_wait')
+
+    def __init__(self):
+        self.started = time.perf_counter()
+        self.queries = 0
+        self.db_time = 0.0
+        self.render_time = 0.0
+        self.pool_wait = 0.0
+
+    @property
+    def elapsed(self):
+        return time.perf_counter() - self.started
+
+    def server_timing(self):
+        return f'db;dur={self.db_time * 1000:.1f};desc="{self.queries} queries", ' \
+               f'render;dur={self.render_time * 1000:.1f}, ' \
+               f'pool;dur={self.pool_wait * 1000:.1f}, ' \
+               f'app;dur={self.elapsed * 1000:.1f}'
+
+
+@contextmanager
+def count_queries(target=Engine):
+    """Collect the SQL statements executed on ``target`` inside the block.
+
+        with count_queries() as statements:
+            client.get('/venues')
+        assert len(statements) <= 1, statements
+    """
+    statements = []
+
+    def record(conn, cursor, statement, parameters, context, executemany):
+        statements.append(statement)
+
+    event.listen(target, 'before_cursor_execute', record)
+    try:
+        yield statements
+    finally:
+        event.remove(target, 'before_cursor_execute', record)
+
+
+def current_stats():
+    return g.get('request_stats') if has_app_context() else None
+
+
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    conn.info.setdefault('query_started', []).append(time.perf_counter())
+
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    elapsed = time.perf_counter() - conn.info['query_started'].pop()
+    if not has_app_context():
+        return
+    stats = g.get('request_stats')
+    if stats is not None:
+        stats.queries += 1
+        stats.db_time += elapsed
+
+    threshold = current_app.config['SLOW_QUERY_THRESHOLD_MS']
+    if threshold is not None and elapsed * 1000 >= threshold:
+        route = request.endpoint if has_request_context() else 'cli'
+        current_app.logger.warning('Slow query (%.1f ms) in %s: %s', elapsed * 1000, route, statement)
+
+
+def _handle_error(exception_context):
+    started = exception_context.connection.info.get('query_started') \
+        if exception_context.connection is not None else None
+    if started:
+        started.pop()
+
+
+class TimedQueuePool(QueuePool):
+    """QueuePool that charges the time spent waiting for a connection to the request."""
+
+    def _do_get(self):
+        started = time.perf_counter()
+        try:
+            return super()._do_get()
+        finally:
+            stats = current_stats()
+            if stats is not None:
+                stats.pool_wait += time.perf_counter() - started
+
+
+class TimedTemplate(Template):
+    """Template that adds its rendering time to the request's stats.
+
+    Lazy loads triggered from the template count as both render and DB time.
+    For streamed templates only the time spent producing chunks is counted,
+    not the time spent waiting for the client to read them.
+    """
+
+    def render(self, *args, **kwargs):
+        started = time.perf_counter()
+        try:
+            return super().render(*args, **kwargs)
+        finally:
+            self._record(time.perf_counter() - started)
+
+    def generate(self, *args, **kwargs):
+        chunks = super().generate(*args, **kwargs)
+        while True:
+            started = time.perf_counter()
+            try:
+                chunk = next(chunks)
+            except StopIteration:
+                self._record(time.perf_counter() - started)
+                return
+            self._record(time.perf_counter() - started)
+            yield chunk
+
+    @staticmethod
+    def _record(elapsed):
+        stats = current_stats()
+        if stats is not None:
+            stats.render_time += elapsed
+
+
+class Instrumentation(object):
+    """Per-request query count, DB time, render time and pool checkout wait.
+
+    Queries slower than ``SLOW_QUERY_THRESHOLD_MS`` are logged with the
+    route that issued them. With ``SERVER_TIMING_ENABLED`` the totals are
+    sent as a ``Server-Timing`` header; for streamed responses the header
+    goes out before the body, so it covers the work done up to that point.
+    """
+
+    def __init__(self, app=None):
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        app.config.setdefault('SLOW_QUERY_THRESHOLD_MS', 250)
+        app.config.setdefault('SERVER_TIMING_ENABLED', True)
+
+        app.jinja_env.template_class = TimedTemplate
+        app.before_request(self._start)
+        app.after_request(self._finish)
+
+        # Engine-wide listeners, so they also cover the lazily created engine.
+        for name, listener in (('before_cursor_execute', _before_cursor_execute),
+                               ('after_cursor_execute', _after_cursor_execute),
+                               ('handle_error', _handle_error)):
+            if not event.contains(Engine, name, listener):
+                event.listen(Engine, name, listener)
+        app.extensions['instrumentation'] = self
+
+    @staticmethod
+    def _start():
+        g.request_stats = RequestStats()
+
+    @staticmethod
+    def _finish(response):
+        stats = g.get('request_stats')
+        if stats is not None and current_app.config['SERVER_TIMING_ENABLED']:
+            response.headers.add('Server-Timing', stats.server_timing())
+        return response
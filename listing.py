@@ -0,0 +1,35 @@
+from sqlalchemy import func, or_, select
+
+COLUMNS = ['id', 'venue_id', 'artist_id', 'start_time', 'venue_name', 'venue_image_link',
+           'venue_city', 'venue_city_key', 'venue_state', 'artist_name', 'artist_image_link']
+
+
+def refresh_show_listing(connection, tables, show_ids=None, venue_ids=None, artist_ids=None):
+    """Rebuild the ``show_listing`` rows of the given shows, venues and artists.
+
+    The rows are deleted and re-inserted from the show/venue/artist join,
+    so one call covers shows that were added, changed or deleted and
+    venues or artists that were renamed or removed. ``connection`` may be a
+    Connection or a Session, and the id arguments lists or selects.
+    """
+    listing = tables['show_listing']
+    show, venue, artist = tables['show'], tables['venue'], tables['artist']
+
+    stale, fresh = [], []
+    for ids, listing_key, show_key in ((show_ids, listing.c.id, show.c.id),
+                                       (venue_ids, listing.c.venue_id, show.c.venue_id),
+                                       (artist_ids, listing.c.artist_id, show.c.artist_id)):
+        if ids is not None:
+            stale.append(listing_key.in_(ids))
+            fresh.append(show_key.in_(ids))
+    if not stale:
+        return
+
+    connection.execute(listing.delete().where(or_(*stale)))
+    rows = select([show.c.id, show.c.venue_id, show.c.artist_id, show.c.start_time,
+                   venue.c.name, venue.c.image_link, venue.c.city, func.lower(venue.c.city), venue.c.state,
+                   artist.c.name, artist.c.image_link]) \
+        .select_from(show.join(venue, venue.c.id == show.c.venue_id)
+                     .join(artist, artist.c.id == show.c.artist_id)) \
+        .where(or_(*fresh))
+    connection.execute(listing.insert().from_select(COLUMNS, rows))
@@ -0,0 +1,325 @@
+import atexit
+import json
+import math
+import os
+import threading
+import time
+from bisect import bisect_left
+
+from flask import current_app, g, request
+
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+
+def escape_label(value):
+    return value.replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+def format_value(value):
+    if value == math.inf:
+        return '+Inf'
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+def format_labels(names, values, extra=()):
+    pairs = list(zip(names, values)) + list(extra)
+    if not pairs:
+        return ''
+    return '{' + ','.join(f'{name}="{escape_label(value)}"' for name, value in pairs) + '}'
+
+
+class Metric(object):
+    """A named family of values keyed by label values.
+
+    ``values`` maps a tuple of label values to the metric's state. Every
+    update holds the metric's lock, so request threads can share it.
+    """
+
+    type = None
+
+    def __init__(self, name, documentation, labelnames=()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self.values = {}
+        self._lock = threading.Lock()
+
+    def _key(self, labels):
+        return tuple(str(labels[name]) for name in self.labelnames)
+
+    def dump(self):
+        with self._lock:
+            return [[list(key), value] for key, value in self.values.items()]
+
+    def merge(self, dumps):
+        """Combine the ``dump()`` of this metric from several processes."""
+        merged = {}
+        for dump in dumps:
+            for key, value in dump:
+                key = tuple(key)
+                merged[key] = self._add(merged[key], value) if key in merged else value
+        return merged
+
+    @staticmethod
+    def _add(a, b):
+        return a + b
+
+    def samples(self, values):
+        for key, value in sorted(values.items()):
+            yield self.name + format_labels(self.labelnames, key), value
+
+
+class Counter(Metric):
+    type = 'counter'
+
+    def inc(self, amount=1, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self.values[key] = self.values.get(key, 0) + amount
+
+
+class Gauge(Metric):
+    """Point-in-time value. Across processes the live values are summed."""
+
+    type = 'gauge'
+
+    def set(self, value, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self.values[key] = value
+
+
+class Histogram(Metric):
+    type = 'histogram'
+
+    def __init__(self, name, documentation, labelnames=(), buckets=DEFAULT_BUCKETS):
+        super().__init__(name, documentation, labelnames)
+        self.buckets = tuple(sorted(buckets))
+
+    def observe(self, value, **labels):
+        key = self._key(labels)
+        index = bisect_left(self.buckets, value)
+        with self._lock:
+            # Per-bucket counts (the last one is +Inf), then the sum.
+            state = self.values.get(key)
+            if state is None:
+                state = self.values[key] = [0] * (len(self.buckets) + 1) + [0.0]
+            state[index] += 1
+            state[-1] += value
+
+    def dump(self):
+        with self._lock:
+            return [[list(key), list(value)] for key, value in self.values.items()]
+
+    @staticmethod
+    def _add(a, b):
+        return [x + y for x, y in zip(a, b)]
+
+    def samples(self, values):
+        bounds = self.buckets + (math.inf,)
+        for key, state in sorted(values.items()):
+            cumulative = 0
+            for bound, count in zip(bounds, state):
+                cumulative += count
+                yield self.name + '_bucket' + format_labels(
+                    self.labelnames, key, [('le', format_value(bound))]), cumulative
+            yield self.name + '_sum' + format_labels(self.labelnames, key), state[-1]
+            yield self.name + '_count' + format_labels(self.labelnames, key), cumulative
+
+
+class Registry(object):
+    def __init__(self):
+        self.metrics = []
+
+    def counter(self, name, documentation, labelnames=()):
+        return self._register(Counter(name, documentation, labelnames))
+
+    def gauge(self, name, documentation, labelnames=()):
+        return self._register(Gauge(name, documentation, labelnames))
+
+    def histogram(self, name, documentation, labelnames=(), buckets=DEFAULT_BUCKETS):
+        return self._register(Histogram(name, documentation, labelnames, buckets))
+
+    def _register(self, metric):
+        self.metrics.append(metric)
+        return metric
+
+    def snapshot(self):
+        return {metric.name: metric.dump() for metric in self.metrics}
+
+    def render(self, snapshots):
+        """Prometheus text exposition of ``(pid, snapshot, alive)`` tuples."""
+        lines = []
+        for metric in self.metrics:
+            dumps = [snapshot.get(metric.name, []) for _, snapshot, alive in snapshots
+                     if alive or metric.type != 'gauge']
+            lines.append(f'# HELP {metric.name} {metric.documentation}')
+            lines.append(f'# TYPE {metric.name} {metric.type}')
+            for sample, value in metric.samples(metric.merge(dumps)):
+                lines.append(f'{sample} {format_value(value)}')
+        return '\n'.join(lines) + '\n'
+
+
+def pid_alive(pid):
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        pass
+    return True
+
+
+def endpoint_label():
+    # Blueprint prefixes are dropped: "main.show_venue" is reported as "show_venue".
+    if request.url_rule is None:
+        return 'unmatched'
+    return request.url_rule.endpoint.rsplit('.', 1)[-1]
+
+
+class _MetricsState(object):
+    """The registry of one application and where its snapshots go."""
+
+    def __init__(self, directory, flush_interval):
+        self.registry = registry = Registry()
+        self.requests = registry.counter(
+            'fyyur_http_requests_total', 'HTTP requests served.', ['endpoint', 'method', 'status'])
+        self.latency = registry.histogram(
+            'fyyur_http_request_duration_seconds',
+            'Time to serve a request, including streaming its body.', ['endpoint', 'method'])
+        self.errors = registry.counter(
+            'fyyur_http_errors_total', 'Responses rendered by the 404 and 500 error handlers.',
+            ['endpoint', 'status'])
+        self.db_queries = registry.counter(
+            'fyyur_db_queries_total', 'SQL statements executed while serving requests.', ['endpoint'])
+        self.db_time = registry.counter(
+            'fyyur_db_query_seconds_total', 'Time spent in SQL statements.', ['endpoint'])
+        self.pool_wait = registry.counter(
+            'fyyur_db_pool_wait_seconds_total', 'Time spent waiting for a pooled connection.', ['endpoint'])
+        self.render_time = registry.counter(
+            'fyyur_template_render_seconds_total', 'Time spent rendering templates.', ['endpoint'])
+        self.pool_size = registry.gauge(
+            'fyyur_db_pool_size', 'Connections the pool keeps open.')
+        self.pool_checked_out = registry.gauge(
+            'fyyur_db_pool_checked_out', 'Pooled connections currently in use.')
+        self.pool_overflow = registry.gauge(
+            'fyyur_db_pool_overflow', 'Connections open beyond the pool size.')
+        self.directory = directory
+        self.flush_interval = flush_interval
+        self._flushed = 0.0
+        self._flush_lock = threading.Lock()
+
+    def flush(self, force=False):
+        now = time.monotonic()
+        if not force and now - self._flushed < self.flush_interval:
+            return
+        with self._flush_lock:
+            self._flushed = now
+            path = os.path.join(self.directory, f'{os.getpid()}.json')
+            tmp_path = f'{path}.tmp'
+            with open(tmp_path, 'w') as f:
+                json.dump(self.registry.snapshot(), f)
+            os.replace(tmp_path, path)
+
+    def read_snapshots(self):
+        snapshots = []
+        for name in os.listdir(self.directory):
+            if not name.endswith('.json'):
+                continue
+            pid = int(name[:-len('.json')])
+            try:
+                with open(os.path.join(self.directory, name)) as f:
+                    snapshot = json.load(f)
+            except (OSError, ValueError):
+                continue
+            snapshots.append((pid, snapshot, pid_alive(pid)))
+        return snapshots
+
+
+class Metrics(object):
+    """Request latency, DB usage, pool utilisation and error counts.
+
+    Each process keeps a registry per application, in
+    ``app.extensions['metrics']``. With ``METRICS_DIR`` set, every process
+    writes a snapshot there (at most once per ``METRICS_FLUSH_INTERVAL``
+    seconds, and on every scrape) and ``/metrics`` sums the snapshots of all
+    processes; gauges only count live processes. Processes also write on
+    exit. The directory must be emptied when the server is restarted.
+    """
+
+    def __init__(self, app=None):
+        self._flush_on_exit = []
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        app.config.setdefault('METRICS_ENABLED', True)
+        app.config.setdefault('METRICS_DIR', None)
+        app.config.setdefault('METRICS_FLUSH_INTERVAL', 1.0)
+
+        state = _MetricsState(app.config['METRICS_DIR'], app.config['METRICS_FLUSH_INTERVAL'])
+        if state.directory:
+            os.makedirs(state.directory, exist_ok=True)
+            if not self._flush_on_exit:
+                atexit.register(self._flush_all)
+            self._flush_on_exit.append(state)
+        if app.config['METRICS_ENABLED']:
+            app.after_request(self._remember_status)
+            app.teardown_request(self._record)
+        app.extensions['metrics'] = state
+
+    @staticmethod
+    def _state():
+        return current_app.extensions['metrics']
+
+    def _flush_all(self):
+        for state in self._flush_on_exit:
+            state.flush(force=True)
+
+    def count_error(self, status):
+        self._state().errors.inc(endpoint=endpoint_label(), status=status)
+
+    def render(self):
+        state = self._state()
+        self.sample_pool(state)
+        if not state.directory:
+            return state.registry.render([(os.getpid(), state.registry.snapshot(), True)])
+        state.flush(force=True)
+        return state.registry.render(state.read_snapshots())
+
+    @staticmethod
+    def sample_pool(state):
+        sqlalchemy = current_app.extensions.get('sqlalchemy')
+        pool = sqlalchemy.db.engine.pool if sqlalchemy is not None else None
+        # Only QueuePool tracks size and overflow; SQLite uses other pools.
+        if pool is None or not hasattr(pool, 'checkedout'):
+            return
+        state.pool_size.set(pool.size())
+        state.pool_checked_out.set(pool.checkedout())
+        state.pool_overflow.set(max(pool.overflow(), 0))
+
+    @staticmethod
+    def _remember_status(response):
+        g.response_status = response.status_code
+        return response
+
+    def _record(self, exc):
+        # Runs at teardown, after a streamed body has been sent.
+        stats = g.get('request_stats')
+        if stats is None:
+            return
+        state = self._state()
+        endpoint = endpoint_label()
+        state.latency.observe(stats.elapsed, endpoint=endpoint, method=request.method)
+        state.requests.inc(endpoint=endpoint, method=request.method,
+                           status=g.get('response_status', 500))
+        if stats.queries:
+            state.db_queries.inc(stats.queries, endpoint=endpoint)
+            state.db_time.inc(stats.db_time, endpoint=endpoint)
+        if stats.pool_wait:
+            state.pool_wait.inc(stats.pool_wait, endpoint=endpoint)
+        if stats.render_time:
+            state.render_time.inc(stats.render_time, endpoint=endpoint)
+        if state.directory:
+            self.sample_pool(state)
+            state.flush()
@@ -72,6 +72,11 @@ def run_migrations_online():
                 directives[:] = []
                 logger.info('No changes in schema detected.')
 
+    # The pg_trgm indexes are created by DDL (models.trigram_index), not
+    # declared in the metadata; don't offer to drop them.
+    def include_object(object, name, type_, reflected, compare_to):
+        return not (type_ == 'index' and reflected and compare_to is None and name.endswith('_trgm'))
+
     connectable = engine_from_config(
         config.get_section(config.config_ini_section),
         prefix='sqlalchemy.',
@@ -79,10 +84,15 @@ def run_migrations_online():
     )
 
     with connectable.connect() as connection:
+        if connection.dialect.name == 'sqlite':
+            # Batch migrations copy and drop tables, which must not cascade to
+            # (or be refused by) the rows that reference them.
+            connection.execute('PRAGMA foreign_keys=OFF')
         context.configure(
             connection=connection,
             target_metadata=target_metadata,
             process_revision_directives=process_revision_directives,
+            include_object=include_object,
             **current_app.extensions['migrate'].configure_args
         )
 
@@ -0,0 +1,31 @@
+"""venue / artist version columns
+
+Revision ID: 2a8f4c6e1b07
+Revises: e19b5a7c2d83
+Create Date: 2026-10-18 13:24:50.228417
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '2a8f4c6e1b07'
+down_revision = 'e19b5a7c2d83'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    for table in ('venue', 'artist'):
+        with op.batch_alter_table(table) as batch_op:
+            batch_op.add_column(sa.Column('version', sa.Integer(), server_default='1', nullable=False))
+            batch_op.add_column(sa.Column('updated_at', sa.DateTime(timezone=True),
+                                          server_default=sa.func.now(), nullable=False))
+
+
+def downgrade():
+    for table in ('artist', 'venue'):
+        with op.batch_alter_table(table) as batch_op:
+            batch_op.drop_column('updated_at')
+            batch_op.drop_column('version')
@@ -0,0 +1,42 @@
+"""show listing city key
+
+Revision ID: 3c8e1f6a9d47
+Revises: a3e9b7d5c162
+Create Date: 2026-10-18 21:14:08.562930
+
+The calendar matches cities case-insensitively, on a lower-cased copy of
+venue_city that leads the city index after the state.
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '3c8e1f6a9d47'
+down_revision = 'a3e9b7d5c162'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    with op.batch_alter_table('show_listing') as batch_op:
+        batch_op.add_column(sa.Column('venue_city_key', sa.String(length=120), nullable=False,
+                                      server_default=''))
+
+    listing = sa.table('show_listing', sa.column('venue_city'), sa.column('venue_city_key'))
+    op.execute(listing.update().values(venue_city_key=sa.func.lower(listing.c.venue_city)))
+
+    op.drop_index('ix_show_listing_state_city_start_time', table_name='show_listing')
+    with op.batch_alter_table('show_listing') as batch_op:
+        batch_op.alter_column('venue_city_key', server_default=None)
+    op.create_index('ix_show_listing_state_city_start_time', 'show_listing',
+                    ['venue_state', 'venue_city_key', 'start_time', 'id'], unique=False)
+
+
+def downgrade():
+    op.drop_index('ix_show_listing_state_city_start_time', table_name='show_listing')
+    with op.batch_alter_table('show_listing') as batch_op:
+        batch_op.drop_column('venue_city_key')
+    op.create_index('ix_show_listing_state_city_start_time', 'show_listing',
+                    ['venue_state', 'venue_city', 'start_time', 'id'], unique=False)
@@ -0,0 +1,54 @@
+"""show counters on venue and artist
+
+Revision ID: 4e6a2c8d0f35
+Revises: 7d3b9e5f2c14
+Create Date: 2026-10-18 16:05:41.392118
+
+"""
+from datetime import datetime
+
+from alembic import op
+import sqlalchemy as sa
+from pytz import utc
+
+
+# revision identifiers, used by Alembic.
+revision = '4e6a2c8d0f35'
+down_revision = '7d3b9e5f2c14'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    for table in ('venue', 'artist'):
+        with op.batch_alter_table(table) as batch_op:
+            batch_op.add_column(sa.Column('upcoming_shows_count', sa.Integer(), server_default='0',
+                                          nullable=False))
+            batch_op.add_column(sa.Column('past_shows_count', sa.Integer(), server_default='0',
+                                          nullable=False))
+            batch_op.add_column(sa.Column('next_show_time', sa.DateTime(timezone=True), nullable=True))
+        op.create_index(f'ix_{table}_next_show_time', table, ['next_show_time'], unique=False)
+
+    # Backfill from the existing shows.
+    now = utc.localize(datetime.now())
+    show = sa.table('show', sa.column('id'), sa.column('venue_id'), sa.column('artist_id'),
+                    sa.column('start_time'))
+    for table in ('venue', 'artist'):
+        owner = sa.table(table, sa.column('id'), sa.column('upcoming_shows_count'),
+                         sa.column('past_shows_count'), sa.column('next_show_time'))
+        belongs = show.c[f'{table}_id'] == owner.c.id
+        upcoming = sa.and_(belongs, show.c.start_time >= now)
+        op.execute(owner.update().values(
+            upcoming_shows_count=sa.select([sa.func.count(show.c.id)]).where(upcoming).as_scalar(),
+            past_shows_count=sa.select([sa.func.count(show.c.id)])
+                .where(sa.and_(belongs, show.c.start_time < now)).as_scalar(),
+            next_show_time=sa.select([sa.func.min(show.c.start_time)]).where(upcoming).as_scalar()))
+
+
+def downgrade():
+    for table in ('artist', 'venue'):
+        op.drop_index(f'ix_{table}_next_show_time', table_name=table)
+        with op.batch_alter_table(table) as batch_op:
+            batch_op.drop_column('next_show_time')
+            batch_op.drop_column('past_shows_count')
+            batch_op.drop_column('upcoming_shows_count')
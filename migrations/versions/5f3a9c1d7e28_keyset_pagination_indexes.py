@@ -0,0 +1,27 @@
+"""keyset pagination indexes
+
+Revision ID: 5f3a9c1d7e28
+Revises: ae202ea2bd20
+Create Date: 2026-10-18 10:12:41.381920
+
+"""
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision = '5f3a9c1d7e28'
+down_revision = 'ae202ea2bd20'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_index('ix_venue_name_id', 'venue', ['name', 'id'], unique=False)
+    op.create_index('ix_artist_name_id', 'artist', ['name', 'id'], unique=False)
+    op.create_index('ix_show_start_time_id', 'show', ['start_time', 'id'], unique=False)
+
+
+def downgrade():
+    op.drop_index('ix_show_start_time_id', table_name='show')
+    op.drop_index('ix_artist_name_id', table_name='artist')
+    op.drop_index('ix_venue_name_id', table_name='venue')
@@ -0,0 +1,33 @@
+"""updated_at indexes for incremental export
+
+Revision ID: 7d3b9e5f2c14
+Revises: 2a8f4c6e1b07
+Create Date: 2026-10-18 14:36:12.871045
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '7d3b9e5f2c14'
+down_revision = '2a8f4c6e1b07'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    with op.batch_alter_table('show') as batch_op:
+        batch_op.add_column(sa.Column('updated_at', sa.DateTime(timezone=True),
+                                      server_default=sa.func.now(), nullable=False))
+    op.create_index('ix_show_updated_at', 'show', ['updated_at'], unique=False)
+    op.create_index('ix_venue_updated_at', 'venue', ['updated_at'], unique=False)
+    op.create_index('ix_artist_updated_at', 'artist', ['updated_at'], unique=False)
+
+
+def downgrade():
+    op.drop_index('ix_artist_updated_at', table_name='artist')
+    op.drop_index('ix_venue_updated_at', table_name='venue')
+    op.drop_index('ix_show_updated_at', table_name='show')
+    with op.batch_alter_table('show') as batch_op:
+        batch_op.drop_column('updated_at')
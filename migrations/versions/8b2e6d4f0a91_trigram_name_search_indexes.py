@@ -0,0 +1,37 @@
+"""trigram name search indexes
+
+Revision ID: 8b2e6d4f0a91
+Revises: 5f3a9c1d7e28
+Create Date: 2026-10-18 11:02:17.504316
+
+On PostgreSQL these are pg_trgm GIN indexes, which serve the
+``name ILIKE '%term%'`` filters used by the search endpoints. Other dialects
+get none: a plain index cannot serve those filters, and the leading column
+of ``ix_*_name_id`` already covers prefix matches.
+
+"""
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision = '8b2e6d4f0a91'
+down_revision = '5f3a9c1d7e28'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    if op.get_bind().dialect.name != 'postgresql':
+        return
+    op.execute('CREATE EXTENSION IF NOT EXISTS pg_trgm')
+    op.create_index('ix_venue_name_trgm', 'venue', ['name'], unique=False,
+                    postgresql_using='gin', postgresql_ops={'name': 'gin_trgm_ops'})
+    op.create_index('ix_artist_name_trgm', 'artist', ['name'], unique=False,
+                    postgresql_using='gin', postgresql_ops={'name': 'gin_trgm_ops'})
+
+
+def downgrade():
+    if op.get_bind().dialect.name != 'postgresql':
+        return
+    op.drop_index('ix_artist_name_trgm', table_name='artist')
+    op.drop_index('ix_venue_name_trgm', table_name='venue')
@@ -0,0 +1,33 @@
+"""import checkpoint table
+
+Revision ID: 9d4f2b7e1a58
+Revises: 3c8e1f6a9d47
+Create Date: 2026-10-18 22:03:47.219604
+
+``flask import --checkpoint NAME`` records its progress here, in the same
+transaction as each batch, instead of in a file written after the commit.
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '9d4f2b7e1a58'
+down_revision = '3c8e1f6a9d47'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table('import_checkpoint',
+    sa.Column('name', sa.String(), nullable=False),
+    sa.Column('source', sa.String(), nullable=False),
+    sa.Column('kind', sa.String(length=20), nullable=False),
+    sa.Column('rows', sa.Integer(), nullable=False),
+    sa.PrimaryKeyConstraint('name', 'source', 'kind')
+    )
+
+
+def downgrade():
+    op.drop_table('import_checkpoint')
@@ -0,0 +1,45 @@
+"""cascade show foreign keys
+
+Revision ID: a3e9b7d5c162
+Revises: f7a1c3e5d824
+Create Date: 2026-10-18 19:10:36.884520
+
+Deleting a venue or an artist now deletes its shows in the database, and
+with them their show_listing rows, instead of SQLAlchemy loading and
+deleting every show one by one.
+
+"""
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision = 'a3e9b7d5c162'
+down_revision = 'f7a1c3e5d824'
+branch_labels = None
+depends_on = None
+
+OWNERS = ('venue', 'artist')
+# Names for the unnamed foreign keys SQLite reflects, so batch mode can drop them.
+NAMING_CONVENTION = {'fk': 'fk_%(table_name)s_%(column_0_name)s_%(referred_table_name)s'}
+
+
+def replace_foreign_keys(ondelete):
+    if op.get_bind().dialect.name == 'sqlite':
+        with op.batch_alter_table('show', naming_convention=NAMING_CONVENTION) as batch_op:
+            for owner in OWNERS:
+                name = f'fk_show_{owner}_id_{owner}'
+                batch_op.drop_constraint(name, type_='foreignkey')
+                batch_op.create_foreign_key(name, owner, [f'{owner}_id'], ['id'], ondelete=ondelete)
+        return
+    for owner in OWNERS:
+        op.drop_constraint(f'show_{owner}_id_fkey', 'show', type_='foreignkey')
+        op.create_foreign_key(f'show_{owner}_id_fkey', 'show', owner, [f'{owner}_id'], ['id'],
+                              ondelete=ondelete)
+
+
+def upgrade():
+    replace_foreign_keys('CASCADE')
+
+
+def downgrade():
+    replace_foreign_keys(None)
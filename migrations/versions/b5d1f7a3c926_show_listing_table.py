@@ -0,0 +1,61 @@
+"""show listing table
+
+Revision ID: b5d1f7a3c926
+Revises: 4e6a2c8d0f35
+Create Date: 2026-10-18 17:12:08.640273
+
+A plain table rather than a PostgreSQL materialized view: a materialized
+view can only be refreshed as a whole, while this table is rebuilt per
+show, venue or artist in the transactions that change them.
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'b5d1f7a3c926'
+down_revision = '4e6a2c8d0f35'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table(
+        'show_listing',
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('venue_id', sa.Integer(), nullable=False),
+        sa.Column('artist_id', sa.Integer(), nullable=False),
+        sa.Column('start_time', sa.DateTime(timezone=True), nullable=True),
+        sa.Column('venue_name', sa.String(), nullable=False),
+        sa.Column('venue_image_link', sa.String(length=500), nullable=True),
+        sa.Column('artist_name', sa.String(), nullable=False),
+        sa.Column('artist_image_link', sa.String(length=500), nullable=True),
+        sa.ForeignKeyConstraint(['id'], ['show.id'], ondelete='CASCADE'),
+        sa.PrimaryKeyConstraint('id')
+    )
+    op.execute('INSERT INTO show_listing (id, venue_id, artist_id, start_time, venue_name, venue_image_link, '
+               'artist_name, artist_image_link) '
+               'SELECT show.id, show.venue_id, show.artist_id, show.start_time, venue.name, venue.image_link, '
+               'artist.name, artist.image_link '
+               'FROM show JOIN venue ON venue.id = show.venue_id JOIN artist ON artist.id = show.artist_id')
+    op.create_index('ix_show_listing_start_time_id', 'show_listing', ['start_time', 'id'], unique=False)
+    op.create_index('ix_show_listing_venue_id', 'show_listing', ['venue_id'], unique=False)
+    op.create_index('ix_show_listing_artist_id', 'show_listing', ['artist_id'], unique=False)
+    # Trigram indexes serve the search ILIKEs on PostgreSQL only; elsewhere a
+    # plain index on the names would never be used.
+    if op.get_bind().dialect.name == 'postgresql':
+        op.create_index('ix_show_listing_venue_name_trgm', 'show_listing', ['venue_name'], unique=False,
+                        postgresql_using='gin', postgresql_ops={'venue_name': 'gin_trgm_ops'})
+        op.create_index('ix_show_listing_artist_name_trgm', 'show_listing', ['artist_name'], unique=False,
+                        postgresql_using='gin', postgresql_ops={'artist_name': 'gin_trgm_ops'})
+
+
+def downgrade():
+    if op.get_bind().dialect.name == 'postgresql':
+        op.drop_index('ix_show_listing_artist_name_trgm', table_name='show_listing')
+        op.drop_index('ix_show_listing_venue_name_trgm', table_name='show_listing')
+    op.drop_index('ix_show_listing_artist_id', table_name='show_listing')
+    op.drop_index('ix_show_listing_venue_id', table_name='show_listing')
+    op.drop_index('ix_show_listing_start_time_id', table_name='show_listing')
+    op.drop_table('show_listing')
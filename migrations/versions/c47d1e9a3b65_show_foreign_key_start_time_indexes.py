@@ -0,0 +1,25 @@
+"""show foreign key / start_time indexes
+
+Revision ID: c47d1e9a3b65
+Revises: 8b2e6d4f0a91
+Create Date: 2026-10-18 11:47:55.093412
+
+"""
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision = 'c47d1e9a3b65'
+down_revision = '8b2e6d4f0a91'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_index('ix_show_venue_id_start_time', 'show', ['venue_id', 'start_time'], unique=False)
+    op.create_index('ix_show_artist_id_start_time', 'show', ['artist_id', 'start_time'], unique=False)
+
+
+def downgrade():
+    op.drop_index('ix_show_artist_id_start_time', table_name='show')
+    op.drop_index('ix_show_venue_id_start_time', table_name='show')
@@ -0,0 +1,51 @@
+"""show end time and no double booking
+
+Revision ID: d2c8f4a6b190
+Revises: b5d1f7a3c926
+Create Date: 2026-10-18 18:02:17.508316
+
+Existing shows are given the default two hours. On PostgreSQL two btree_gist
+exclusion constraints then reject overlapping shows of a venue or an artist;
+the upgrade fails if existing shows already overlap, and those have to be
+moved or shortened first. Other dialects rely on the check the application
+makes before every insert.
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'd2c8f4a6b190'
+down_revision = 'b5d1f7a3c926'
+branch_labels = None
+depends_on = None
+
+OWNERS = ('venue', 'artist')
+
+
+def upgrade():
+    op.add_column('show', sa.Column('end_time', sa.DateTime(timezone=True), nullable=True))
+
+    dialect = op.get_bind().dialect.name
+    if dialect == 'postgresql':
+        op.execute("UPDATE show SET end_time = start_time + interval '2 hours'")
+        op.execute('CREATE EXTENSION IF NOT EXISTS btree_gist')
+        for owner in OWNERS:
+            op.execute(f'ALTER TABLE show ADD CONSTRAINT show_{owner}_no_overlap EXCLUDE USING gist '
+                       f'({owner}_id WITH =, tstzrange(start_time, end_time) WITH &&) '
+                       f'WHERE (start_time IS NOT NULL AND end_time IS NOT NULL)')
+    elif dialect == 'sqlite':
+        # Keeps the fractional seconds SQLAlchemy stores, so values compare as strings.
+        op.execute("UPDATE show SET end_time = strftime('%Y-%m-%d %H:%M:%S', start_time, '+2 hours') "
+                   "|| substr(start_time, 20)")
+    else:
+        op.execute('UPDATE show SET end_time = start_time + INTERVAL 2 HOUR')
+
+
+def downgrade():
+    if op.get_bind().dialect.name == 'postgresql':
+        for owner in reversed(OWNERS):
+            op.execute(f'ALTER TABLE show DROP CONSTRAINT show_{owner}_no_overlap')
+    with op.batch_alter_table('show') as batch_op:
+        batch_op.drop_column('end_time')
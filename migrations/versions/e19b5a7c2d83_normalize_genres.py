@@ -0,0 +1,93 @@
+"""normalize genres
+
+Revision ID: e19b5a7c2d83
+Revises: c47d1e9a3b65
+Create Date: 2026-10-18 12:31:08.716254
+
+Moves the comma-joined ``venue.genres`` / ``artist.genres`` strings into a
+``genre`` table with ``venue_genre`` / ``artist_genre`` association tables,
+copying the existing data across.
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'e19b5a7c2d83'
+down_revision = 'c47d1e9a3b65'
+branch_labels = None
+depends_on = None
+
+genre = sa.table('genre', sa.column('id', sa.Integer), sa.column('name', sa.String))
+owners = {
+    'venue': sa.table('venue', sa.column('id', sa.Integer), sa.column('genres', sa.String)),
+    'artist': sa.table('artist', sa.column('id', sa.Integer), sa.column('genres', sa.String)),
+}
+associations = {
+    'venue': sa.table('venue_genre', sa.column('genre_id', sa.Integer), sa.column('venue_id', sa.Integer)),
+    'artist': sa.table('artist_genre', sa.column('genre_id', sa.Integer), sa.column('artist_id', sa.Integer)),
+}
+
+
+def upgrade():
+    op.create_table('genre',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('name', sa.String(length=120), nullable=False),
+    sa.PrimaryKeyConstraint('id'),
+    sa.UniqueConstraint('name')
+    )
+    for owner in ('venue', 'artist'):
+        op.create_table(f'{owner}_genre',
+        sa.Column('genre_id', sa.Integer(), nullable=False),
+        sa.Column(f'{owner}_id', sa.Integer(), nullable=False),
+        sa.ForeignKeyConstraint(['genre_id'], ['genre.id'], ondelete='CASCADE'),
+        sa.ForeignKeyConstraint([f'{owner}_id'], [f'{owner}.id'], ondelete='CASCADE'),
+        sa.PrimaryKeyConstraint('genre_id', f'{owner}_id')
+        )
+        op.create_index(f'ix_{owner}_genre_{owner}_id', f'{owner}_genre', [f'{owner}_id'], unique=False)
+
+    bind = op.get_bind()
+    memberships = {}
+    for owner, table in owners.items():
+        for owner_id, genres in bind.execute(sa.select([table.c.id, table.c.genres])):
+            names = [name.strip() for name in (genres or '').split(',') if name.strip()]
+            memberships.setdefault(owner, []).extend((owner_id, name) for name in dict.fromkeys(names))
+
+    names = sorted({name for rows in memberships.values() for _, name in rows})
+    if names:
+        op.bulk_insert(genre, [{'name': name} for name in names])
+    genre_ids = {name: genre_id for genre_id, name in bind.execute(sa.select([genre.c.id, genre.c.name]))}
+    for owner, rows in memberships.items():
+        if rows:
+            op.bulk_insert(associations[owner],
+                           [{'genre_id': genre_ids[name], f'{owner}_id': owner_id} for owner_id, name in rows])
+
+    for owner in ('venue', 'artist'):
+        with op.batch_alter_table(owner) as batch_op:
+            batch_op.drop_column('genres')
+
+
+def downgrade():
+    for owner in ('venue', 'artist'):
+        with op.batch_alter_table(owner) as batch_op:
+            batch_op.add_column(sa.Column('genres', sa.String(), nullable=True))
+
+    bind = op.get_bind()
+    for owner, table in owners.items():
+        association = associations[owner]
+        owner_id = association.c[f'{owner}_id']
+        joined = {}
+        rows = bind.execute(sa.select([owner_id, genre.c.name])
+                            .select_from(association.join(genre, genre.c.id == association.c.genre_id))
+                            .order_by(owner_id, genre.c.name))
+        for row_owner_id, name in rows:
+            joined.setdefault(row_owner_id, []).append(name)
+        for row_owner_id, names in joined.items():
+            bind.execute(table.update().where(table.c.id == row_owner_id).values(genres=','.join(names)))
+
+    op.drop_index('ix_artist_genre_artist_id', table_name='artist_genre')
+    op.drop_table('artist_genre')
+    op.drop_index('ix_venue_genre_venue_id', table_name='venue_genre')
+    op.drop_table('venue_genre')
+    op.drop_table('genre')
@@ -0,0 +1,42 @@
+"""show listing city and calendar index
+
+Revision ID: f7a1c3e5d824
+Revises: d2c8f4a6b190
+Create Date: 2026-10-18 18:41:53.117092
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'f7a1c3e5d824'
+down_revision = 'd2c8f4a6b190'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    with op.batch_alter_table('show_listing') as batch_op:
+        batch_op.add_column(sa.Column('venue_city', sa.String(length=120), nullable=False, server_default=''))
+        batch_op.add_column(sa.Column('venue_state', sa.String(length=120), nullable=False, server_default=''))
+
+    listing = sa.table('show_listing', sa.column('venue_id'), sa.column('venue_city'),
+                       sa.column('venue_state'))
+    venue = sa.table('venue', sa.column('id'), sa.column('city'), sa.column('state'))
+    op.execute(listing.update().values(
+        venue_city=sa.select([venue.c.city]).where(venue.c.id == listing.c.venue_id).as_scalar(),
+        venue_state=sa.select([venue.c.state]).where(venue.c.id == listing.c.venue_id).as_scalar()))
+
+    with op.batch_alter_table('show_listing') as batch_op:
+        batch_op.alter_column('venue_city', server_default=None)
+        batch_op.alter_column('venue_state', server_default=None)
+    op.create_index('ix_show_listing_state_city_start_time', 'show_listing',
+                    ['venue_state', 'venue_city', 'start_time', 'id'], unique=False)
+
+
+def downgrade():
+    op.drop_index('ix_show_listing_state_city_start_time', table_name='show_listing')
+    with op.batch_alter_table('show_listing') as batch_op:
+        batch_op.drop_column('venue_state')
+        batch_op.drop_column('venue_city')
@@ -0,0 +1,401 @@
+from datetime import datetime
+from itertools import groupby
+
+from pytz import utc
+from sqlalchemy import DDL, case, event, func
+
+import booking
+from counters import refresh_show_counts
+from extensions import db
+from listing import refresh_show_listing
+
+
+def utc_now():
+    return utc.localize(datetime.now())
+
+
+def as_utc(value):
+    if value is None or value.tzinfo is not None:
+        return value
+    return utc.localize(value)
+
+
+def trigram_index(table, column):
+    """A pg_trgm GIN index on ``column``, for the ILIKE filters of name search.
+
+    Created only on PostgreSQL, and so kept out of the metadata: other
+    dialects would build a b-tree no search can use.
+    """
+    event.listen(table, 'after_create', DDL(
+        f'CREATE INDEX ix_{table.name}_{column}_trgm ON {table.name} '
+        f'USING gin ({column} gin_trgm_ops)').execute_if(dialect='postgresql'))
+
+
+event.listen(db.metadata, 'before_create',
+             DDL('CREATE EXTENSION IF NOT EXISTS pg_trgm').execute_if(dialect='postgresql'))
+
+
+class Versioned(object):
+    version = db.Column(db.Integer, nullable=False, default=1, server_default='1')
+    updated_at = db.Column(db.DateTime(timezone=True), nullable=False, default=utc_now,
+                           server_default=func.now())
+
+    @classmethod
+    def touch(cls, ids):
+        db.session.query(cls).filter(cls.id.in_(ids)) \
+            .update({cls.version: cls.version + 1, cls.updated_at: utc_now()}, synchronize_session=False)
+
+    @classmethod
+    def freshness(cls, entity_id, show_key, now):
+        last_started = db.session.query(func.max(Show.start_time)) \
+            .filter(show_key == entity_id, Show.start_time < now).label('last_started')
+        return db.session.query(cls.version, cls.updated_at, last_started) \
+            .filter(cls.id == entity_id).first()
+
+
+class ShowCounters(object):
+    """Show counts kept on the venue / artist row for the listing pages.
+
+    Writes to ``show`` call :meth:`refresh_show_counts` for the rows they
+    affect; ``flask roll-shows`` moves shows to past as they start.
+    """
+    upcoming_shows_count = db.Column(db.Integer, nullable=False, default=0, server_default='0')
+    past_shows_count = db.Column(db.Integer, nullable=False, default=0, server_default='0')
+    next_show_time = db.Column(db.DateTime(timezone=True))
+
+    @classmethod
+    def refresh_show_counts(cls, ids):
+        refresh_show_counts(db.session, db.metadata.tables, cls.__tablename__, ids, utc_now())
+
+
+class Show(db.Model):
+    __tablename__ = 'show'
+    __table_args__ = (db.Index('ix_show_start_time_id', 'start_time', 'id'),
+                      db.Index('ix_show_venue_id_start_time', 'venue_id', 'start_time'),
+                      db.Index('ix_show_artist_id_start_time', 'artist_id', 'start_time'),
+                      db.Index('ix_show_updated_at', 'updated_at'))
+
+    id = db.Column(db.Integer, primary_key=True)
+    venue_id = db.Column(db.Integer, db.ForeignKey('venue.id', ondelete='CASCADE'))
+    artist_id = db.Column(db.Integer, db.ForeignKey('artist.id', ondelete='CASCADE'))
+    start_time = db.Column(db.DateTime(timezone=True))
+    # Exclusive: a show ending at 22:00 and one starting at 22:00 do not overlap.
+    end_time = db.Column(db.DateTime(timezone=True))
+    updated_at = db.Column(db.DateTime(timezone=True), nullable=False, default=utc_now, onupdate=utc_now,
+                           server_default=func.now())
+
+    def __repr__(self):
+        return f'<Show {self.id}>'
+
+    @property
+    def duration(self):
+        if self.start_time is None or self.end_time is None:
+            return None
+        return self.end_time - self.start_time
+
+    @staticmethod
+    def book(rows):
+        """Insert the bookable shows of ``rows`` (see :func:`booking.book`); returns (booked rows, errors)."""
+        return booking.book(db.session.connection(), db.metadata.tables, rows, utc_now())
+
+    @staticmethod
+    def availability(owner, owner_id, start, end):
+        """(busy shows, free (start, end) slots) of a venue or artist in ``[start, end)``."""
+        busy = db.session.execute(booking.overlapping(db.metadata.tables, owner, owner_id, start, end)) \
+            .fetchall()
+        slots = booking.free_slots([(as_utc(row.start_time), as_utc(row.end_time)) for row in busy],
+                                   start, end)
+        return busy, slots
+
+    @classmethod
+    def listing_query(cls):
+        return db.session.query(cls.id, cls.venue_id, cls.artist_id, cls.start_time,
+                                Venue.name.label('venue_name'),
+                                Venue.image_link.label('venue_image_link'),
+                                Artist.name.label('artist_name'),
+                                Artist.image_link.label('artist_image_link')) \
+            .join(Venue, Venue.id == cls.venue_id) \
+            .join(Artist, Artist.id == cls.artist_id)
+
+    @classmethod
+    def upcoming_and_past(cls, key, value, now, limit):
+        is_upcoming = cls.start_time >= now
+        is_past = cls.start_time < now
+        upcoming_count, past_count = db.session.query(func.count(case([(is_upcoming, cls.id)])),
+                                                      func.count(case([(is_past, cls.id)]))) \
+            .filter(key == value).one()
+
+        shows = cls.listing_query().filter(key == value)
+        return {
+            'upcoming_shows': shows.filter(is_upcoming)
+                .order_by(cls.start_time, cls.id).limit(limit).all(),
+            'past_shows': shows.filter(is_past)
+                .order_by(cls.start_time.desc(), cls.id.desc()).limit(limit).all(),
+            'upcoming_shows_count': upcoming_count,
+            'past_shows_count': past_count
+        }
+
+
+# On PostgreSQL the database itself rejects double bookings. Elsewhere the
+# writers check with booking.conflicts / booking.conflicting_rows.
+event.listen(Show.__table__, 'before_create',
+             DDL('CREATE EXTENSION IF NOT EXISTS btree_gist').execute_if(dialect='postgresql'))
+for _owner in booking.OWNERS:
+    event.listen(Show.__table__, 'after_create', DDL(
+        f'ALTER TABLE show ADD CONSTRAINT show_{_owner}_no_overlap EXCLUDE USING gist '
+        f'({_owner}_id WITH =, tstzrange(start_time, end_time) WITH &&) '
+        f'WHERE (start_time IS NOT NULL AND end_time IS NOT NULL)').execute_if(dialect='postgresql'))
+
+
+class ShowListing(db.Model):
+    """Shows joined with their venue and artist names, for /shows and show search.
+
+    A plain table kept in step by :meth:`refresh` in the transactions that
+    write shows, venues or artists.
+    """
+    __tablename__ = 'show_listing'
+    __table_args__ = (db.Index('ix_show_listing_start_time_id', 'start_time', 'id'),
+                      db.Index('ix_show_listing_venue_id', 'venue_id'),
+                      db.Index('ix_show_listing_artist_id', 'artist_id'),
+                      db.Index('ix_show_listing_state_city_start_time', 'venue_state', 'venue_city_key',
+                               'start_time', 'id'))
+
+    id = db.Column(db.Integer, db.ForeignKey('show.id', ondelete='CASCADE'), primary_key=True)
+    venue_id = db.Column(db.Integer, nullable=False)
+    artist_id = db.Column(db.Integer, nullable=False)
+    start_time = db.Column(db.DateTime(timezone=True))
+    venue_name = db.Column(db.String, nullable=False)
+    venue_image_link = db.Column(db.String(500))
+    venue_city = db.Column(db.String(120), nullable=False)
+    venue_state = db.Column(db.String(120), nullable=False)
+    # lower(venue_city), for matching cities case-insensitively.
+    venue_city_key = db.Column(db.String(120), nullable=False)
+    artist_name = db.Column(db.String, nullable=False)
+    artist_image_link = db.Column(db.String(500))
+
+    def __repr__(self):
+        return f'<ShowListing {self.id}>'
+
+    @classmethod
+    def listing_query(cls):
+        return db.session.query(cls.id, cls.venue_id, cls.artist_id, cls.start_time, cls.venue_name,
+                                cls.venue_image_link, cls.artist_name, cls.artist_image_link)
+
+    @classmethod
+    def calendar_query(cls, start, end, city=None, state=None):
+        """Shows starting in ``[start, end)``, optionally in one city, by start time.
+
+        Cities match case-insensitively. With a city and state this is one
+        range scan of the state/city/start index; without, of the start-time
+        index.
+        """
+        query = cls.listing_query().add_columns(cls.venue_city, cls.venue_state) \
+            .filter(cls.start_time >= start.astimezone(utc), cls.start_time < end.astimezone(utc))
+        if state:
+            query = query.filter(cls.venue_state == state)
+        if city:
+            query = query.filter(cls.venue_city_key == func.lower(city))
+        return query.order_by(cls.start_time, cls.id)
+
+    @staticmethod
+    def group_by_day(rows, tz=utc):
+        """(date, shows) per day in ``tz`` for rows ordered by start time, consumed lazily."""
+        return ((day, list(day_rows))
+                for day, day_rows in groupby(rows, key=lambda row: as_utc(row.start_time).astimezone(tz).date()))
+
+    @classmethod
+    def refresh(cls, show_ids=None, venue_ids=None, artist_ids=None):
+        refresh_show_listing(db.session, db.metadata.tables, show_ids=show_ids, venue_ids=venue_ids,
+                             artist_ids=artist_ids)
+
+
+trigram_index(ShowListing.__table__, 'venue_name')
+trigram_index(ShowListing.__table__, 'artist_name')
+
+
+class Genre(db.Model):
+    __tablename__ = 'genre'
+
+    id = db.Column(db.Integer, primary_key=True)
+    name = db.Column(db.String(120), nullable=False, unique=True)
+
+    def __repr__(self):
+        return f'<Genre {self.id} {self.name}>'
+
+    @classmethod
+    def get_or_create(cls, names):
+        names = list(dict.fromkeys(names))
+        if not names:
+            return []
+        existing = {genre.name: genre for genre in cls.query.filter(cls.name.in_(names))}
+        return [existing.get(name) or cls(name=name) for name in names]
+
+    @classmethod
+    def names_for(cls, owner_key, ids):
+        association = owner_key.table
+        rows = db.session.query(owner_key, cls.name).select_from(association) \
+            .join(cls, cls.id == association.c.genre_id) \
+            .filter(owner_key.in_(ids)).order_by(owner_key, cls.name)
+        names = {}
+        for owner_id, name in rows:
+            names.setdefault(owner_id, []).append(name)
+        return names
+
+
+venue_genre = db.Table(
+    'venue_genre',
+    db.Column('genre_id', db.Integer, db.ForeignKey('genre.id', ondelete='CASCADE'), primary_key=True),
+    db.Column('venue_id', db.Integer, db.ForeignKey('venue.id', ondelete='CASCADE'), primary_key=True),
+    db.Index('ix_venue_genre_venue_id', 'venue_id')
+)
+
+artist_genre = db.Table(
+    'artist_genre',
+    db.Column('genre_id', db.Integer, db.ForeignKey('genre.id', ondelete='CASCADE'), primary_key=True),
+    db.Column('artist_id', db.Integer, db.ForeignKey('artist.id', ondelete='CASCADE'), primary_key=True),
+    db.Index('ix_artist_genre_artist_id', 'artist_id')
+)
+
+# Input rows committed so far by each named ``flask import`` (importer.Checkpoint).
+import_checkpoint = db.Table(
+    'import_checkpoint',
+    db.Column('name', db.String, primary_key=True),
+    db.Column('source', db.String, primary_key=True),
+    db.Column('kind', db.String(20), primary_key=True),
+    db.Column('rows', db.Integer, nullable=False)
+)
+
+
+class Venue(Versioned, ShowCounters, db.Model):
+    __tablename__ = 'venue'
+    __table_args__ = (db.Index('ix_venue_name_id', 'name', 'id'),
+                      db.Index('ix_venue_updated_at', 'updated_at'),
+                      db.Index('ix_venue_next_show_time', 'next_show_time'),
+                      {'extend_existing': True})
+
+    id = db.Column(db.Integer, primary_key=True)
+    name = db.Column(db.String, nullable=False)
+    city = db.Column(db.String(120), nullable=False)
+    state = db.Column(db.String(120), nullable=False)
+    address = db.Column(db.String(120), nullable=False)
+    genres = db.relationship('Genre', secondary=venue_genre, order_by='Genre.name', passive_deletes=True)
+    phone = db.Column(db.String(120))
+    image_link = db.Column(db.String(500), nullable=False)
+    facebook_link = db.Column(db.String(120))
+    seeking_talent = db.Column(db.Boolean, nullable=False, default=False)
+    website = db.Column(db.String(120))
+    # The database deletes the shows (and their listing rows) with the venue.
+    shows = db.relationship("Show", cascade="all,delete", passive_deletes=True, backref="venue")
+
+    def __repr__(self):
+        return f'<Venue {self.id} {self.name}>'
+
+    @property
+    def serialize(self):
+        return {
+            'id': self.id,
+            'name': self.name,
+            'city': self.city,
+            'state': self.state,
+            'address': self.address,
+            'genres': [genre.name for genre in self.genres],
+            'phone': self.phone,
+            'image_link': self.image_link,
+            'seeking_talent': self.seeking_talent,
+            'facebook_link': self.facebook_link,
+            'website': self.website
+        }
+
+    @classmethod
+    def in_genre(cls, name):
+        return cls.id.in_(db.session.query(venue_genre.c.venue_id)
+                          .join(Genre, Genre.id == venue_genre.c.genre_id)
+                          .filter(Genre.name == name))
+
+    @classmethod
+    def listing_query(cls):
+        return db.session.query(cls.id, cls.name, cls.city, cls.state,
+                                cls.upcoming_shows_count.label('num_upcoming_shows'))
+
+    @staticmethod
+    def group_by_city_state(rows):
+        rows = sorted(rows, key=lambda row: (row.state, row.city))
+        return [{'city': city,
+                 'state': state,
+                 'venues': [{'id': row.id,
+                             'name': row.name,
+                             'num_upcoming_shows': row.num_upcoming_shows}
+                            for row in area_rows]}
+                for (city, state), area_rows in groupby(rows, key=lambda row: (row.city, row.state))]
+
+
+trigram_index(Venue.__table__, 'name')
+
+
+class Artist(Versioned, ShowCounters, db.Model):
+    __tablename__ = 'artist'
+    __table_args__ = (db.Index('ix_artist_name_id', 'name', 'id'),
+                      db.Index('ix_artist_updated_at', 'updated_at'),
+                      db.Index('ix_artist_next_show_time', 'next_show_time'),
+                      {'extend_existing': True})
+
+    id = db.Column(db.Integer, primary_key=True)
+    name = db.Column(db.String, nullable=False)
+    city = db.Column(db.String(120), nullable=False)
+    state = db.Column(db.String(120), nullable=False)
+    phone = db.Column(db.String(120))
+    genres = db.relationship('Genre', secondary=artist_genre, order_by='Genre.name', passive_deletes=True)
+    image_link = db.Column(db.String(500), nullable=False)
+    facebook_link = db.Column(db.String(120))
+    seeking_venue = db.Column(db.Boolean, nullable=False, default=False)
+    website = db.Column(db.String(120))
+    shows = db.relationship("Show", cascade="all,delete", passive_deletes=True, backref="artist")
+
+    def __repr__(self):
+        return f'<Artist {self.id} {self.name}>'
+
+    @classmethod
+    def in_genre(cls, name):
+        return cls.id.in_(db.session.query(artist_genre.c.artist_id)
+                          .join(Genre, Genre.id == artist_genre.c.genre_id)
+                          .filter(Genre.name == name))
+
+    @property
+    def serialize(self):
+        return {
+            'id': self.id,
+            'name': self.name,
+            'city': self.city,
+            'state': self.state,
+            'phone': self.phone,
+            'genres': [genre.name for genre in self.genres],
+            'image_link': self.image_link,
+            'seeking_venue': self.seeking_venue,
+            'facebook_link': self.facebook_link,
+            'website': self.website
+        }
+
+
+trigram_index(Artist.__table__, 'name')
+
+
+def delete_owners(model, ids):
+    """Delete the venues or artists in ``ids`` with one statement.
+
+    Their shows, show listing rows and genre links go with them through the
+    foreign keys' ON DELETE CASCADE, without being loaded. The other side of
+    each deleted show is locked first and then recounted. Returns the ids
+    that existed and were deleted, and the ids of that other side.
+    """
+    partner = Artist if model is Venue else Venue
+    key, partner_key = (Show.venue_id, Show.artist_id) if model is Venue else (Show.artist_id, Show.venue_id)
+    deleted = [entity_id for (entity_id,) in db.session.query(model.id).filter(model.id.in_(ids))]
+    if not deleted:
+        return [], []
+    partner_ids = [partner_id for (partner_id,) in
+                   db.session.query(partner_key).filter(key.in_(deleted)).distinct()]
+
+    partner.touch(partner_ids)
+    db.session.query(model).filter(model.id.in_(deleted)).delete(synchronize_session=False)
+    partner.refresh_show_counts(partner_ids)
+    return deleted, partner_ids
@@ -0,0 +1,61 @@
+import base64
+import json
+from collections import namedtuple
+from datetime import datetime
+
+from sqlalchemy import tuple_
+
+Page = namedtuple('Page', ['items', 'next_cursor', 'prev_cursor'])
+
+
+def encode_cursor(values):
+    payload = [{'dt': v.isoformat()} if isinstance(v, datetime) else v for v in values]
+    raw = json.dumps(payload, separators=(',', ':')).encode('utf-8')
+    return base64.urlsafe_b64encode(raw).decode('ascii').rstrip('=')
+
+
+def decode_cursor(cursor):
+    try:
+        raw = base64.urlsafe_b64decode(cursor + '=' * (-len(cursor) % 4))
+        payload = json.loads(raw.decode('utf-8'))
+        return [datetime.fromisoformat(v['dt']) if isinstance(v, dict) else v for v in payload]
+    except (ValueError, TypeError, KeyError, UnicodeDecodeError):
+        raise ValueError(f'Malformed cursor {cursor!r}')
+
+
+def keyset_paginate(query, keys, limit, after=None, before=None):
+    """Fetch one page of ``query`` ordered by the ``keys`` columns.
+
+    ``after`` / ``before`` are cursors returned in a previous ``Page``. The
+    page boundary is a row-value comparison on ``keys``, so with a matching
+    index every page costs the same no matter how deep it is.
+    """
+    names = [key.key for key in keys]
+    row_key = tuple_(*keys)
+
+    def boundary(cursor):
+        values = decode_cursor(cursor)
+        if len(values) != len(keys):
+            raise ValueError(f'Cursor {cursor!r} does not match the page keys')
+        return tuple_(*values)
+
+    if before is not None:
+        rows = query.filter(row_key < boundary(before)) \
+            .order_by(*[key.desc() for key in keys]).limit(limit + 1).all()
+        has_more = len(rows) > limit
+        items = rows[:limit][::-1]
+        has_prev, has_next = has_more, True
+    else:
+        if after is not None:
+            query = query.filter(row_key > boundary(after))
+        rows = query.order_by(*keys).limit(limit + 1).all()
+        has_more = len(rows) > limit
+        items = rows[:limit]
+        has_prev, has_next = after is not None, has_more
+
+    def cursor_for(row):
+        return encode_cursor([getattr(row, name) for name in names])
+
+    return Page(items=items,
+                next_cursor=cursor_for(items[-1]) if items and has_next else None,
+                prev_cursor=cursor_for(items[0]) if items and has_prev else None)
@@ -0,0 +1,49 @@
+from datetime import datetime, timedelta
+
+from flask import current_app, request, url_for
+from pytz import utc
+
+from models import utc_now
+
+
+def page_args():
+    limit = request.args.get('limit', current_app.config['PAGE_SIZE'], type=int)
+    return {'limit': min(max(limit, 1), current_app.config['MAX_PAGE_SIZE']),
+            'after': request.args.get('after'),
+            'before': request.args.get('before')}
+
+
+def page_url(**cursor):
+    args = request.args.to_dict()
+    args.pop('after', None)
+    args.pop('before', None)
+    args.update(cursor)
+    return url_for(request.endpoint, **request.view_args, **args)
+
+
+def parse_time(value, tz=utc):
+    value = datetime.fromisoformat(value)
+    return value if value.tzinfo is not None else value.replace(tzinfo=tz)
+
+
+def calendar_args():
+    """city, state, from and to of a calendar request; ValueError if malformed.
+
+    ``from`` defaults to the start of today and ``to`` (exclusive) to
+    ``CALENDAR_DEFAULT_DAYS`` later; dates or ISO 8601 times, UTC unless an
+    offset is given. The calendar's days run in the offset of ``from``, so
+    ``from=2024-06-01T00:00:00-07:00`` lists shows by Pacific dates, and
+    ``to`` is in that offset unless it gives its own.
+    """
+    start = request.args.get('from')
+    start = parse_time(start) if start else \
+        utc_now().replace(hour=0, minute=0, second=0, microsecond=0)
+    end = request.args.get('to')
+    end = parse_time(end, start.tzinfo).astimezone(start.tzinfo) if end else \
+        start + timedelta(days=current_app.config['CALENDAR_DEFAULT_DAYS'])
+    max_days = current_app.config['CALENDAR_MAX_DAYS']
+    if not start < end <= start + timedelta(days=max_days):
+        raise ValueError(f'to must be after from and at most {max_days} days later')
+    return {'city': request.args.get('city', '').strip() or None,
+            'state': request.args.get('state', '').strip().upper() or None,
+            'start': start, 'end': end}
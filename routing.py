@@ -0,0 +1,106 @@
+import random
+import time
+
+from flask import current_app, g, has_request_context, request, session
+from flask_sqlalchemy import SignallingSession, SQLAlchemy
+from sqlalchemy import orm
+from sqlalchemy.sql.expression import UpdateBase
+
+SAFE_METHODS = ('GET', 'HEAD', 'OPTIONS')
+
+
+def replica_key(index):
+    return f'replica_{index}'
+
+
+def read_from_primary(view):
+    """Keep a GET view on the primary, e.g. a form that is about to be saved."""
+    view.db_route = 'primary'
+    return view
+
+
+def read_from_replica(view):
+    """Send a read-only view to a replica even though it is a POST (searches)."""
+    view.db_route = 'replica'
+    return view
+
+
+def view_route():
+    view = current_app.view_functions.get(request.endpoint)
+    route = getattr(view, 'db_route', None)
+    if route is None:
+        route = 'replica' if request.method in SAFE_METHODS and view is not None else 'primary'
+    return route
+
+
+def replica_window():
+    """Seconds this request's reads may lag behind the primary: 0 unless it reads a replica."""
+    if has_request_context() and g.get('db_replica') is not None:
+        return current_app.config['REPLICA_STICKY_SECONDS']
+    return 0
+
+
+class RoutingSession(SignallingSession):
+    """Session that sends the reads of replica-routed requests to a replica.
+
+    Flushes and Core INSERT/UPDATE/DELETE statements always go to the
+    primary, so a request that writes despite being routed to a replica
+    still writes to the right server.
+    """
+
+    def __init__(self, db, **options):
+        self.db = db
+        super().__init__(db, **options)
+
+    def get_bind(self, mapper=None, clause=None):
+        replica = g.get('db_replica') if has_request_context() else None
+        if replica is not None and not self._flushing and not isinstance(clause, UpdateBase):
+            return self.db.get_engine(self.app, bind=replica)
+        return super().get_bind(mapper, clause)
+
+
+class RoutingSQLAlchemy(SQLAlchemy):
+    """``SQLAlchemy`` with reads routed to ``SQLALCHEMY_REPLICA_URIS``.
+
+    Each replica becomes a bind named ``replica_<n>``. A GET request, or a
+    view marked with ``read_from_replica``, picks one of them at random and
+    the session reads from it for the whole request. Other methods, views
+    marked with ``read_from_primary`` and, for ``REPLICA_STICKY_SECONDS``
+    after a write, every request from the same browser session stay on the
+    primary, so users see their own writes despite replication lag. Without
+    replicas everything uses the primary.
+    """
+
+    def init_app(self, app):
+        app.config.setdefault('SQLALCHEMY_REPLICA_URIS', [])
+        app.config.setdefault('REPLICA_STICKY_SECONDS', 10)
+
+        replicas = app.config['SQLALCHEMY_REPLICA_URIS']
+        if replicas:
+            binds = dict(app.config.get('SQLALCHEMY_BINDS') or {})
+            binds.update((replica_key(i), uri) for i, uri in enumerate(replicas))
+            app.config['SQLALCHEMY_BINDS'] = binds
+            app.before_request(self._route)
+            app.after_request(self._stick)
+        super().init_app(app)
+
+    def create_session(self, options):
+        return orm.sessionmaker(class_=RoutingSession, db=self, **options)
+
+    @property
+    def read_engine(self):
+        """The engine for Core reads: the request's replica, else the primary."""
+        replica = g.get('db_replica') if has_request_context() else None
+        return self.get_engine(bind=replica) if replica is not None else self.engine
+
+    @staticmethod
+    def _route():
+        if view_route() != 'replica' or session.get('read_primary_until', 0) > time.time():
+            return
+        g.db_replica = replica_key(random.randrange(len(current_app.config['SQLALCHEMY_REPLICA_URIS'])))
+
+    @staticmethod
+    def _stick(response):
+        if view_route() == 'primary' and request.method not in SAFE_METHODS and response.status_code < 400:
+            session['read_primary_until'] = time.time() + current_app.config['REPLICA_STICKY_SECONDS']
+        return response
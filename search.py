@@ -0,0 +1,45 @@
+from sqlalchemy import case, func, or_
+
+LIKE_ESCAPE = '\\'
+
+# Ranks a column the term does not occur in after every column it does.
+NO_MATCH = 2 ** 31 - 1
+
+
+def escape_like(term):
+    return term.replace(LIKE_ESCAPE, LIKE_ESCAPE * 2) \
+        .replace('%', LIKE_ESCAPE + '%') \
+        .replace('_', LIKE_ESCAPE + '_')
+
+
+def contains(column, term):
+    return column.ilike(f'%{escape_like(term)}%', escape=LIKE_ESCAPE)
+
+
+def best(function, values):
+    return values[0] if len(values) == 1 else function(*values)
+
+
+def name_search(query, columns, term, limit, dialect_name):
+    """Case-insensitive substring search on ``columns``, best matches first.
+
+    ``columns`` is one column or a list of them; a row matches on any and is
+    ranked by the one it matches best. On PostgreSQL the ILIKE filters are
+    served by the pg_trgm GIN indexes on the columns and results are ranked
+    by trigram similarity. Other dialects (SQLite test databases) scan and
+    rank by match position, then length.
+    """
+    if not isinstance(columns, (list, tuple)):
+        columns = [columns]
+    query = query.filter(or_(*(contains(column, term) for column in columns)))
+
+    if dialect_name == 'postgresql':
+        ranking = [best(func.greatest, [func.similarity(column, term) for column in columns]).desc()]
+    else:
+        positions = [(column, func.instr(func.lower(column), term.lower())) for column in columns]
+        ranking = [best(func.min, [case([(position > 0, position)], else_=NO_MATCH)
+                                   for _, position in positions]),
+                   best(func.min, [case([(position > 0, func.length(column))], else_=NO_MATCH)
+                                   for column, position in positions])]
+
+    return query.order_by(*ranking, *columns).limit(limit)
@@ -0,0 +1,143 @@
+import random
+from datetime import datetime, timedelta
+from itertools import accumulate
+
+from sqlalchemy import select
+
+from forms import VenueForm
+from importer import Importer
+
+# Venues, artists and shows generated at each scale.
+SCALES = {
+    '250': (25, 50, 250),
+    '1k': (50, 100, 1000),
+    '100k': (5000, 10000, 100000),
+    '1m': (50000, 100000, 1000000),
+}
+
+# Ordered by size; a city's share of the catalog falls off with its rank.
+CITIES = [('New York', 'NY'), ('Los Angeles', 'CA'), ('Chicago', 'IL'), ('Houston', 'TX'),
+          ('San Francisco', 'CA'), ('Austin', 'TX'), ('Seattle', 'WA'), ('Nashville', 'TN'),
+          ('Boston', 'MA'), ('Denver', 'CO'), ('Atlanta', 'GA'), ('New Orleans', 'LA'),
+          ('Portland', 'OR'), ('Philadelphia', 'PA'), ('Minneapolis', 'MN'), ('Detroit', 'MI'),
+          ('Miami', 'FL'), ('San Diego', 'CA'), ('Phoenix', 'AZ'), ('Oakland', 'CA')]
+GENRES = [value for value, _ in VenueForm.genres.kwargs['choices']]
+VENUE_WORDS = (['The Blue', 'Velvet', 'Golden', 'Electric', 'Red', 'Silver', 'Union', 'Echo', 'Old Town',
+                'Hidden', 'Copper', 'Midnight'],
+               ['Room', 'Hall', 'Garden', 'Cellar', 'Lounge', 'Ballroom', 'Tavern', 'Theater', 'Club',
+                'Warehouse'])
+ARTIST_WORDS = (['Velvet', 'Broken', 'Wild', 'Neon', 'Quiet', 'Paper', 'Northern', 'Lucky', 'Crystal',
+                 'Howling', 'Silver', 'Young'],
+                ['Hearts', 'Rivers', 'Owls', 'Machines', 'Brothers', 'Sisters', 'Collective', 'Trio',
+                 'Quartet', 'Orchestra', 'Kids', 'Ghosts'])
+STREETS = ['Main St', 'Market St', 'Broadway', 'Mission St', 'Elm St', 'Oak Ave', '2nd Ave', 'Sunset Blvd']
+
+
+def zipf_cum_weights(count, exponent=1.0):
+    return list(accumulate(1 / rank ** exponent for rank in range(1, count + 1)))
+
+
+class Generator(object):
+    """Reproducible venue, artist and show rows in the importer's input format.
+
+    Cities, genres and the venues/artists that shows are booked at follow a
+    Zipf distribution by position, so the first ids are the busiest. Shows
+    fall over the two years before and the year after ``now``, in the
+    evening and more often at weekends.
+    """
+
+    def __init__(self, seed=1, now=None):
+        self.rng = random.Random(seed)
+        self.now = (now or datetime.now()).replace(minute=0, second=0, microsecond=0)
+        self.city_weights = zipf_cum_weights(len(CITIES))
+        self.genre_weights = zipf_cum_weights(len(GENRES), exponent=0.8)
+
+    def _city(self):
+        return self.rng.choices(CITIES, cum_weights=self.city_weights)[0]
+
+    def _genres(self, most):
+        count = self.rng.randint(1, most)
+        return sorted(set(self.rng.choices(GENRES, cum_weights=self.genre_weights, k=count)))
+
+    def _phone(self):
+        return f'{self.rng.randint(200, 999)}-{self.rng.randint(200, 999)}-{self.rng.randint(0, 9999):04d}'
+
+    def _name(self, words, number):
+        first, second = words
+        return f'{self.rng.choice(first)} {self.rng.choice(second)} {number}'
+
+    def venues(self, count):
+        for number in range(1, count + 1):
+            city, state = self._city()
+            slug = f'venue{number}'
+            yield {'name': self._name(VENUE_WORDS, number), 'city': city, 'state': state,
+                   'address': f'{self.rng.randint(1, 2000)} {self.rng.choice(STREETS)}',
+                   'phone': self._phone(), 'genres': self._genres(3),
+                   'image_link': f'https://images.example.com/{slug}.jpg',
+                   'facebook_link': f'https://www.facebook.com/{slug}',
+                   'website': f'https://{slug}.example.com',
+                   'seeking_talent': self.rng.random() < 0.3}
+
+    def artists(self, count):
+        for number in range(1, count + 1):
+            city, state = self._city()
+            slug = f'artist{number}'
+            yield {'name': self._name(ARTIST_WORDS, number), 'city': city, 'state': state,
+                   'phone': self._phone(), 'genres': self._genres(2),
+                   'image_link': f'https://images.example.com/{slug}.jpg',
+                   'facebook_link': f'https://www.facebook.com/{slug}',
+                   'website': f'https://{slug}.example.com',
+                   'seeking_venue': self.rng.random() < 0.4}
+
+    def start_time(self):
+        while True:
+            day = self.now + timedelta(days=self.rng.randint(-730, 365))
+            # Friday and Saturday are twice as likely as the other days.
+            if day.weekday() in (4, 5) or self.rng.random() < 0.5:
+                break
+        return day.replace(hour=self.rng.choice([18, 19, 20, 20, 21, 21, 22, 23]))
+
+    def shows(self, count, venue_ids, artist_ids):
+        """At most one show per venue and per artist and evening, so none double-book.
+
+        A draw that lands on a taken evening is redrawn, which caps the
+        busiest venues and artists at one show a night.
+        """
+        venue_weights = zipf_cum_weights(len(venue_ids), exponent=0.7)
+        artist_weights = zipf_cum_weights(len(artist_ids), exponent=0.7)
+        booked = set()
+        for _ in range(count):
+            while True:
+                venue_id = self.rng.choices(venue_ids, cum_weights=venue_weights)[0]
+                artist_id = self.rng.choices(artist_ids, cum_weights=artist_weights)[0]
+                start_time = self.start_time()
+                if ('venue', venue_id, start_time.date()) not in booked and \
+                        ('artist', artist_id, start_time.date()) not in booked:
+                    break
+            booked.update((('venue', venue_id, start_time.date()), ('artist', artist_id, start_time.date())))
+            yield {'venue_id': venue_id, 'artist_id': artist_id, 'start_time': start_time.isoformat(),
+                   'duration': self.rng.choice([60, 90, 120, 120, 180])}
+
+
+def load(engine, metadata, kind, rows, batch_size=5000, on_batch=None):
+    """Import generated rows through the bulk importer; returns the new ids."""
+    importer = Importer(engine, metadata, kind)
+    inserted, rejected, _ = importer.run(rows, batch_size, importer.checkpoint(None, 'seed'),
+                                         on_batch=on_batch)
+    if rejected:
+        raise RuntimeError(f'{rejected} generated {kind} failed validation')
+    table = metadata.tables[kind[:-1]]
+    with engine.connect() as connection:
+        ids = [row.id for row in connection.execute(
+            select([table.c.id]).order_by(table.c.id.desc()).limit(inserted))]
+    return ids[::-1]
+
+
+def seed(engine, metadata, scale, seed=1, batch_size=5000, on_batch=None):
+    """Add the ``scale`` catalog; returns (venue_ids, artist_ids, shows)."""
+    venues, artists, shows = SCALES[scale]
+    generator = Generator(seed)
+    venue_ids = load(engine, metadata, 'venues', generator.venues(venues), batch_size, on_batch)
+    artist_ids = load(engine, metadata, 'artists', generator.artists(artists), batch_size, on_batch)
+    load(engine, metadata, 'shows', generator.shows(shows, venue_ids, artist_ids), batch_size, on_batch)
+    return venue_ids, artist_ids, shows
@@ -0,0 +1,5 @@
+import os
+import sys
+
+# The route cases and budgets live with the benchmarks.
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'benchmarks'))
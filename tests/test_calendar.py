@@ -0,0 +1,49 @@
+"""The show calendar: its days, times and city filter."""
+import os
+from datetime import datetime
+
+import pytest
+
+from app import create_app
+from extensions import db
+from models import Artist, Show, ShowListing, Venue
+
+
+@pytest.fixture
+def client(tmp_path):
+    app = create_app({'SQLALCHEMY_DATABASE_URI': f"sqlite:///{os.path.join(tmp_path, 'calendar.db')}",
+                      'RESPONSE_CACHE_ENABLED': False})
+    with app.app_context():
+        db.create_all()
+        venue = Venue(name='The Fillmore', city='San Francisco', state='CA', address='1805 Geary Blvd',
+                      image_link='https://images.example.com/v.jpg')
+        artist = Artist(name='Quiet Quartet', city='Oakland', state='CA',
+                        image_link='https://images.example.com/a.jpg')
+        # 8pm on June 1st in San Francisco.
+        db.session.add(Show(venue=venue, artist=artist, start_time=datetime(2030, 6, 2, 3),
+                            end_time=datetime(2030, 6, 2, 5)))
+        db.session.flush()
+        ShowListing.refresh(show_ids=db.session.query(Show.id))
+        db.session.commit()
+    return app.test_client()
+
+
+def dates(client, query):
+    calendar = client.get(f'/api/v1/shows/calendar?{query}').get_json()
+    return [day['date'] for day in calendar['days']]
+
+
+def test_days_are_in_the_offset_of_from(client):
+    assert dates(client, 'from=2030-06-01&to=2030-06-03') == ['2030-06-02']
+    assert dates(client, 'from=2030-06-01T00:00:00-07:00&to=2030-06-03') == ['2030-06-01']
+
+
+def test_the_page_shows_local_times(client):
+    page = client.get('/shows/calendar?from=2030-06-01T00:00:00-07:00').get_data(as_text=True)
+    assert 'Saturday, June 1' in page
+    assert '8:00PM' in page
+
+
+def test_cities_match_in_any_case(client):
+    for city in ('San Francisco', 'san francisco', 'SAN FRANCISCO'):
+        assert dates(client, f'from=2030-06-01&to=2030-06-03&city={city}&state=ca') == ['2030-06-02']
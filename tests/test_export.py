@@ -0,0 +1,49 @@
+"""Exports: incremental filters, and importing an export back."""
+import io
+
+import pytest
+
+from exporter import export_chunks, parse_since
+from extensions import db
+from importer import Importer, read_rows
+from models import as_utc
+from routes import setup
+
+
+def shows(connection):
+    show = db.metadata.tables['show']
+    return {(row.venue_id, row.artist_id, as_utc(row.start_time), as_utc(row.end_time))
+            for row in connection.execute(show.select())}
+
+
+@pytest.mark.parametrize('fmt', ['csv', 'ndjson'])
+def test_shows_round_trip(fmt):
+    app, _, _ = setup('250', 1)
+    with app.app_context():
+        exported = ''.join(export_chunks(db.engine, db.metadata, 'shows', fmt))
+        with db.engine.begin() as connection:
+            before = shows(connection)
+            connection.execute(db.metadata.tables['show'].delete())
+
+        importer = Importer(db.engine, db.metadata, 'shows')
+        inserted, rejected, _ = importer.run(read_rows(io.StringIO(exported, newline=''), fmt), 100,
+                                             importer.checkpoint(None, f'shows.{fmt}'))
+        assert (inserted, rejected) == (len(before), 0)
+        with db.engine.connect() as connection:
+            assert shows(connection) == before
+        assert len({end - start for _, _, start, end in before}) > 1
+
+
+def test_since_with_an_offset_filters_in_utc():
+    app, _, _ = setup('250', 1)
+    with app.app_context():
+        venue = db.metadata.tables['venue']
+        with db.engine.begin() as connection:
+            connection.execute(venue.update().where(venue.c.id <= 3)
+                               .values(updated_at=parse_since('2024-01-01T12:00:00')))
+            connection.execute(venue.update().where(venue.c.id > 3)
+                               .values(updated_at=parse_since('2024-01-01T08:00:00')))
+        # 13:00 at +02:00 is 11:00 UTC: the venues updated at 12:00 UTC are newer.
+        exported = ''.join(export_chunks(db.engine, db.metadata, 'venues', 'ndjson',
+                                         since=parse_since('2024-01-01T13:00:00+02:00')))
+        assert len(exported.splitlines()) == 3
@@ -0,0 +1,42 @@
+"""The bulk importer: its COPY input and resuming from a checkpoint."""
+from datetime import datetime
+
+import pytest
+from pytz import utc
+
+from extensions import db
+from importer import Importer, copy_field
+from routes import setup
+from seed import Generator
+
+
+def test_copy_keeps_nulls_apart_from_empty_strings():
+    row = {'id': 7, 'name': 'The "Blue" Room', 'phone': '', 'website': None, 'facebook_link': None,
+           'seeking_talent': True, 'updated_at': utc.localize(datetime(2024, 1, 2, 20, 30))}
+    assert ','.join(copy_field(value) for value in row.values()) == \
+        '7,"The ""Blue"" Room","",,,True,"2024-01-02 20:30:00+00:00"'
+
+
+def test_resuming_after_a_crash_loads_each_row_once():
+    app, _, _ = setup('250', 1)
+    rows = list(Generator(seed=2).venues(25))
+
+    def crash(*args):
+        raise KeyboardInterrupt
+
+    with app.app_context():
+        venue = db.metadata.tables['venue']
+        before = db.session.query(venue).count()
+        importer = Importer(db.engine, db.metadata, 'venues')
+        # Stopped right after the first batch was committed.
+        with pytest.raises(KeyboardInterrupt):
+            importer.run(iter(rows), 10, importer.checkpoint('nightly', 'venues.ndjson'), on_batch=crash)
+
+        checkpoint = importer.checkpoint('nightly', 'venues.ndjson')
+        assert checkpoint.rows == 10
+        inserted, _, _ = importer.run(iter(rows), 10, checkpoint)
+        checkpoint.clear()
+
+        assert inserted == 15
+        assert db.session.query(venue).count() == before + 25
+        assert importer.checkpoint('nightly', 'venues.ndjson').rows == 0
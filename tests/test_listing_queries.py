@@ -0,0 +1,33 @@
+"""/venues and /artists run the same statements for any number of venues."""
+import pytest
+
+from instrumentation import count_queries
+from routes import setup
+
+PATHS = ('/venues', '/venues?genre=Jazz', '/artists')
+
+
+def statements(scale):
+    app, _, _ = setup(scale, 1)
+    client = app.test_client()
+    counts = {}
+    for path in PATHS:
+        client.get(path)
+        with count_queries() as executed:
+            response = client.get(path)
+            response.get_data()
+        assert response.status_code == 200
+        counts[path] = executed
+    return counts
+
+
+@pytest.fixture(scope='module')
+def counts():
+    return statements('250'), statements('1k')
+
+
+@pytest.mark.parametrize('path', PATHS)
+def test_constant_query_count(counts, path):
+    small, large = counts
+    assert len(small[path]) == len(large[path]), large[path]
+    assert len(large[path]) == 1, large[path]
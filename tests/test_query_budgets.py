@@ -0,0 +1,34 @@
+"""Every route stays within its query budget, whatever the catalog size.
+
+Runs the ``benchmarks/query_budgets.py`` check at two small scales; the
+script itself covers the large ones.
+"""
+import pytest
+
+from query_budgets import BUDGETS, measure
+
+SCALES = ('250', '1k')
+
+
+@pytest.fixture(scope='module')
+def counts():
+    return [measure(scale, random_seed=1) for scale in SCALES]
+
+
+@pytest.mark.parametrize('name', sorted(BUDGETS))
+def test_route_within_budget(counts, name):
+    (small, _), (large, _) = counts
+    assert len(small[name]) <= BUDGETS[name], small[name]
+    assert len(large[name]) <= BUDGETS[name], large[name]
+
+
+@pytest.mark.parametrize('name', sorted(BUDGETS))
+def test_route_queries_do_not_grow_with_data(counts, name):
+    (small, _), (large, _) = counts
+    assert len(large[name]) <= len(small[name]), large[name]
+
+
+def test_every_route_is_budgeted(counts):
+    (small, missing), _ = counts
+    assert not missing
+    assert set(small) == set(BUDGETS)
@@ -0,0 +1,89 @@
+"""Reads go to a replica, writes and the reads right after them to the primary.
+
+Uses two SQLite files with different artists in them, so each page shows
+which one it read from.
+"""
+import os
+
+import pytest
+from sqlalchemy import create_engine
+
+import cache
+import routing
+from app import create_app
+from extensions import db
+from routes import ARTIST_FORM
+
+
+def add_artist(engine, name):
+    with engine.begin() as connection:
+        connection.execute(db.metadata.tables['artist'].insert(),
+                           {'name': name, 'city': 'New York', 'state': 'NY',
+                            'image_link': 'https://images.example.com/a.jpg'})
+
+
+def make_app(tmp_path, cache=False):
+    primary, replica = (f"sqlite:///{os.path.join(tmp_path, name)}.db" for name in ('primary', 'replica'))
+    app = create_app({'SQLALCHEMY_DATABASE_URI': primary, 'SQLALCHEMY_REPLICA_URIS': [replica],
+                      'REPLICA_STICKY_SECONDS': 10, 'RESPONSE_CACHE_ENABLED': cache,
+                      'WTF_CSRF_ENABLED': False})
+    for uri, name in ((primary, 'Primary Quartet'), (replica, 'Replica Quartet')):
+        engine = create_engine(uri)
+        db.metadata.create_all(engine)
+        add_artist(engine, name)
+        engine.dispose()
+    return app
+
+
+@pytest.fixture
+def app(tmp_path):
+    return make_app(tmp_path)
+
+
+def test_reads_go_to_the_replica(app):
+    page = app.test_client().get('/artists').get_data(as_text=True)
+    assert 'Replica Quartet' in page
+    assert 'Primary Quartet' not in page
+
+
+def test_read_from_primary_views_stay_on_the_primary(app):
+    response = app.test_client().get('/artists/1/edit')
+    assert response.status_code == 200
+    assert 'Primary Quartet' in response.get_data(as_text=True)
+
+
+def test_writes_go_to_the_primary_and_reads_stick_to_it(app, monkeypatch):
+    client = app.test_client()
+    client.post('/artists/create', data=dict(ARTIST_FORM, name='Fresh Trio'))
+
+    with app.app_context():
+        assert {name for (name,) in db.session.execute('SELECT name FROM artist')} == \
+            {'Primary Quartet', 'Fresh Trio'}
+        replica = db.get_engine(bind=routing.replica_key(0))
+        assert [name for (name,) in replica.execute('SELECT name FROM artist')] == ['Replica Quartet']
+
+    # The writer reads its own write; other browsers still read the replica.
+    assert 'Fresh Trio' in client.get('/artists').get_data(as_text=True)
+    assert 'Replica Quartet' in app.test_client().get('/artists').get_data(as_text=True)
+
+    # Once the window has passed, the writer is back on the replica too.
+    later = routing.time.time() + app.config['REPLICA_STICKY_SECONDS'] + 1
+    monkeypatch.setattr(routing.time, 'time', lambda: later)
+    assert 'Replica Quartet' in client.get('/artists').get_data(as_text=True)
+
+
+def test_pages_read_from_a_replica_just_after_a_write_are_not_cached(tmp_path, monkeypatch):
+    app = make_app(tmp_path, cache=True)
+    writer, reader = app.test_client(), app.test_client()
+    assert [reader.get('/artists/1').headers['X-Cache'] for _ in range(2)] == ['MISS', 'HIT']
+
+    writer.post('/artists/1/edit', data=dict(ARTIST_FORM, name='Renamed Quartet'))
+
+    # The replica has not caught up: its page is served but not cached.
+    responses = [reader.get('/artists/1') for _ in range(2)]
+    assert [response.headers['X-Cache'] for response in responses] == ['MISS', 'MISS']
+    assert 'Replica Quartet' in responses[-1].get_data(as_text=True)
+
+    later = cache.time.monotonic() + app.config['REPLICA_STICKY_SECONDS'] + 1
+    monkeypatch.setattr(cache.time, 'monotonic', lambda: later)
+    assert [reader.get('/artists/1').headers['X-Cache'] for _ in range(2)] == ['MISS', 'HIT']
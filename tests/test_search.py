@@ -0,0 +1,37 @@
+"""Show search ranks each show by the better of its artist and venue matches."""
+import os
+import re
+from datetime import datetime
+
+import pytest
+
+from app import create_app
+from extensions import db
+from models import Artist, Show, ShowListing, Venue
+
+
+@pytest.fixture
+def client(tmp_path):
+    app = create_app({'SQLALCHEMY_DATABASE_URI': f"sqlite:///{os.path.join(tmp_path, 'search.db')}",
+                      'RESPONSE_CACHE_ENABLED': False, 'WTF_CSRF_ENABLED': False})
+    with app.app_context():
+        db.create_all()
+        for hour, (venue_name, artist_name) in enumerate((('Park Stage', 'The Blue Jazz Band'),
+                                                         ('Jazz', 'Quiet Quartet'),
+                                                         ('Riverside', 'Jazzy'))):
+            venue = Venue(name=venue_name, city='New York', state='NY', address='1 Main St',
+                          image_link='https://images.example.com/v.jpg')
+            artist = Artist(name=artist_name, city='New York', state='NY',
+                            image_link='https://images.example.com/a.jpg')
+            db.session.add(Show(venue=venue, artist=artist, start_time=datetime(2030, 1, 1, hour),
+                                end_time=datetime(2030, 1, 1, hour + 1)))
+        db.session.flush()
+        ShowListing.refresh(show_ids=db.session.query(Show.id))
+        db.session.commit()
+    return app.test_client()
+
+
+def test_shows_are_ranked_by_their_best_match(client):
+    page = client.post('/shows/search', data={'search_term': 'jazz'}).get_data(as_text=True)
+    assert re.findall(r'<a href="/artists/\d+">([^<]+)</a>', page) == \
+        ['Quiet Quartet', 'Jazzy', 'The Blue Jazz Band']
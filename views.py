@@ -0,0 +1,604 @@
+import csv
+import io
+from datetime import datetime, timedelta
+from functools import wraps
+
+import babel
+import dateutil.parser
+from flask import Blueprint, Response, abort, current_app, flash, get_flashed_messages, jsonify, \
+    make_response, redirect, render_template, request, session, stream_with_context, url_for
+from pytz import utc
+from werkzeug.exceptions import HTTPException
+
+from booking import MAX_DURATION, parse_duration
+from extensions import db, metrics, response_cache
+from forms import ArtistForm, ShowBatchForm, ShowForm, VenueForm
+from models import Artist, Genre, Show, ShowListing, Venue, as_utc, delete_owners, utc_now
+from pagination import keyset_paginate
+from request_args import calendar_args, page_args, page_url
+from routing import read_from_primary, read_from_replica
+from search import name_search
+
+bp = Blueprint('main', __name__)
+bp.add_app_template_global(page_url)
+
+
+# ----------------------------------------------------------------------------#
+# Filters.
+# ----------------------------------------------------------------------------#
+
+@bp.app_template_filter('datetime')
+def format_datetime(value, format='medium', tzinfo=None):
+    if type(value) != datetime:
+        date = dateutil.parser.parse(value)
+    else:
+        date = value
+
+    if format == 'full':
+        format = "EEEE MMMM, d, y 'at' h:mma"
+    elif format == 'medium':
+        format = "EE MM, dd, y h:mma"
+    return babel.dates.format_datetime(date, format, tzinfo=tzinfo, locale='en')
+
+
+def stream_template(template_name, **context):
+    current_app.update_template_context(context)
+    # Pop flashed messages before the session cookie goes out with the headers.
+    get_flashed_messages()
+    template = current_app.jinja_env.get_template(template_name)
+    return stream_with_context(template.generate(context))
+
+
+def paginate(query, keys):
+    try:
+        return keyset_paginate(query, keys, **page_args())
+    except ValueError:
+        abort(400)
+
+
+BATCH_FIELDS = ('artist_id', 'venue_id', 'start_time', 'duration')
+
+
+def batch_rows():
+    """The rows of a /shows/batch request, as dicts.
+
+    A JSON body is a list of show objects or ``{"shows": [...]}``; the form
+    takes one ``artist_id, venue_id, start_time[, duration]`` line per show.
+    """
+    if request.is_json:
+        body = request.get_json()
+        rows = body.get('shows') if isinstance(body, dict) else body
+        if not isinstance(rows, list) or not all(isinstance(row, dict) for row in rows):
+            raise ValueError('Expected a list of shows')
+        return rows
+    lines = csv.reader(io.StringIO(request.form.get('shows', '')), skipinitialspace=True)
+    return [dict(zip(BATCH_FIELDS, line)) for line in lines if any(field.strip() for field in line)]
+
+
+def parse_batch_row(row):
+    """(show values, errors by field) of one batch row; errors is empty when it is valid."""
+    show, errors = {}, {}
+    for key in ('artist_id', 'venue_id'):
+        try:
+            show[key] = int(row.get(key))
+        except (TypeError, ValueError):
+            errors[key] = ['Not an id']
+    try:
+        show['start_time'] = as_utc(dateutil.parser.parse(str(row['start_time'])))
+    except (KeyError, ValueError, OverflowError):
+        errors['start_time'] = ['Not a date and time']
+    try:
+        duration = parse_duration(row.get('duration'))
+    except (TypeError, ValueError):
+        errors['duration'] = [f'Minutes, from 1 to {MAX_DURATION // timedelta(minutes=1)}']
+    if not errors:
+        show['end_time'] = show['start_time'] + duration
+    return show, errors
+
+
+def conditional_get(model, show_key, id_arg):
+    """Answer If-None-Match / If-Modified-Since from one version lookup.
+
+    The validators combine the row's version with the start time of its most
+    recent past show, since a show moving from upcoming to past changes the
+    page without any write.
+    """
+    def decorator(view):
+        @wraps(view)
+        def wrapper(**kwargs):
+            if '_flashes' in session:
+                return view(**kwargs)
+
+            entity_id = kwargs[id_arg]
+            row = model.freshness(entity_id, show_key, utc_now())
+            if row is None:
+                return view(**kwargs)
+
+            last_started = as_utc(row.last_started)
+            last_modified = max(filter(None, [as_utc(row.updated_at), last_started]))
+            last_modified = last_modified.astimezone(utc).replace(tzinfo=None, microsecond=0)
+            etag = f'{model.__tablename__}-{entity_id}-{row.version}-' \
+                   f'{int(last_started.timestamp()) if last_started else 0}'
+
+            if request.if_none_match:
+                not_modified = request.if_none_match.contains_weak(etag)
+            else:
+                not_modified = request.if_modified_since is not None and \
+                               last_modified <= request.if_modified_since
+
+            response = Response(status=304) if not_modified else make_response(view(**kwargs))
+            if response.status_code in (200, 304):
+                response.set_etag(etag, weak=True)
+                response.last_modified = last_modified
+                response.cache_control.no_cache = True
+            return response
+        return wrapper
+    return decorator
+
+
+# ----------------------------------------------------------------------------#
+# Controllers.
+# ----------------------------------------------------------------------------#
+
+@bp.route('/')
+def index():
+    return render_template('pages/home.html')
+
+
+#  Venues
+#  ----------------------------------------------------------------
+
+@bp.route('/venues')
+@response_cache.cached('venues')
+def venues():
+    query = Venue.listing_query()
+    genre = request.args.get('genre')
+    if genre:
+        query = query.filter(Venue.in_genre(genre))
+    page = paginate(query, [Venue.name, Venue.id])
+    data = Venue.group_by_city_state(page.items)
+
+    return render_template('pages/venues.html', areas=data, page=page)
+
+
+@bp.route('/venues/search', methods=['POST'])
+@read_from_replica
+def search_venues():
+    search_term = request.form.get('search_term', '')
+    venues = name_search(db.session.query(Venue.id, Venue.name), Venue.name, search_term,
+                         current_app.config['SEARCH_RESULT_LIMIT'], db.engine.dialect.name).all()
+
+    response = {'count': len(venues),
+                "data": venues}
+
+    return render_template('pages/search_venues.html', results=response,
+                           search_term=search_term)
+
+
+@bp.route('/venues/<int:venue_id>')
+@conditional_get(Venue, Show.venue_id, 'venue_id')
+@response_cache.cached('venue:{venue_id}')
+def show_venue(venue_id):
+    venue = Venue.query.get_or_404(venue_id)
+    data = venue.serialize
+    data.update(Show.upcoming_and_past(Show.venue_id, venue_id, utc_now(),
+                                       current_app.config['DETAIL_SHOWS_LIMIT']))
+    response_cache.tag(*{f'artist:{show.artist_id}' for show in data['upcoming_shows'] + data['past_shows']})
+
+    return render_template('pages/show_venue.html', venue=data)
+
+
+#  Create Venue
+#  ----------------------------------------------------------------
+
+@bp.route('/venues/create', methods=['GET'])
+def create_venue_form():
+    form = VenueForm()
+    return render_template('forms/new_venue.html', form=form)
+
+
+@bp.route('/venues/create', methods=['POST'])
+def create_venue_submission():
+    data = request.form
+
+    try:
+        genres = Genre.get_or_create(request.form.getlist('genres'))
+
+        tmp_seeking_artist = request.form.get('seeking_artist', default=False)
+        seeking_artist = True if tmp_seeking_artist == 'y' else False
+
+        new_venue = Venue(
+            name=data['name'],
+            city=data['city'],
+            state=data['state'],
+            address=data['address'],
+            phone=data['phone'],
+            genres=genres,
+            seeking_talent=seeking_artist,
+            image_link=data['image_link'],
+            facebook_link=data['facebook_link'],
+            website=data['website']
+        )
+        db.session.add(new_venue)
+        db.session.commit()
+        response_cache.invalidate('venues')
+        flash('Venue ' + data['name'] + ' was successfully listed!')
+    except:
+        db.session.rollback()
+        flash('An error occurred. Venue ' + data['name'] + ' could not be listed.')
+    finally:
+        db.session.close()
+
+    return render_template('pages/home.html')
+
+
+#  Delete Venue
+#  ----------------------------------------------------------------
+
+@bp.route('/venues/<int:venue_id>/delete', methods=['DELETE'])
+def delete_venue(venue_id):
+    try:
+        deleted, artist_ids = delete_owners(Venue, [venue_id])
+        if not deleted:
+            abort(404)
+        db.session.commit()
+        response_cache.invalidate('venues', 'shows', f'venue:{venue_id}',
+                                  *[f'artist:{artist_id}' for artist_id in artist_ids])
+
+        flash(f'Venue {venue_id} was successfully deleted!')
+    except HTTPException:
+        raise
+    except:
+        db.session.rollback()
+        flash(f'An error occurred. Venue {venue_id} could not be deleted.')
+    finally:
+        db.session.close()
+
+    return render_template('pages/home.html')
+
+
+#  Artists
+#  ----------------------------------------------------------------
+@bp.route('/artists')
+@response_cache.cached('artists')
+def artists():
+    query = db.session.query(Artist.id, Artist.name)
+    genre = request.args.get('genre')
+    if genre:
+        query = query.filter(Artist.in_genre(genre))
+    page = paginate(query, [Artist.name, Artist.id])
+
+    return render_template('pages/artists.html', artists=page.items, page=page)
+
+
+@bp.route('/artists/search', methods=['POST'])
+@read_from_replica
+def search_artists():
+    search_term = request.form.get('search_term', '')
+    artists = name_search(db.session.query(Artist.id, Artist.name), Artist.name, search_term,
+                          current_app.config['SEARCH_RESULT_LIMIT'], db.engine.dialect.name).all()
+
+    response = {'count': len(artists),
+                "data": artists}
+
+    return render_template('pages/search_artists.html', results=response,
+                           search_term=search_term)
+
+
+@bp.route('/artists/<int:artist_id>')
+@conditional_get(Artist, Show.artist_id, 'artist_id')
+@response_cache.cached('artist:{artist_id}')
+def show_artist(artist_id):
+    artist = Artist.query.get_or_404(artist_id)
+    data = artist.serialize
+    data.update(Show.upcoming_and_past(Show.artist_id, artist_id, utc_now(),
+                                       current_app.config['DETAIL_SHOWS_LIMIT']))
+    response_cache.tag(*{f'venue:{show.venue_id}' for show in data['upcoming_shows'] + data['past_shows']})
+
+    return render_template('pages/show_artist.html', artist=data)
+
+
+@bp.route('/artists/<int:artist_id>/delete', methods=['DELETE'])
+def delete_artist(artist_id):
+    try:
+        deleted, venue_ids = delete_owners(Artist, [artist_id])
+        if not deleted:
+            abort(404)
+        db.session.commit()
+        response_cache.invalidate('artists', 'venues', 'shows', f'artist:{artist_id}',
+                                  *[f'venue:{venue_id}' for venue_id in venue_ids])
+
+        flash(f'Artist {artist_id} was successfully deleted!')
+    except HTTPException:
+        raise
+    except:
+        db.session.rollback()
+        flash(f'An error occurred. Artist {artist_id} could not be deleted.')
+    finally:
+        db.session.close()
+
+    return render_template('pages/home.html')
+
+
+#  Update
+#  ----------------------------------------------------------------
+@bp.route('/artists/<int:artist_id>/edit', methods=['GET'])
+@read_from_primary
+def edit_artist(artist_id):
+    form = ArtistForm()
+
+    artist = db.session.query(Artist).filter(Artist.id == artist_id).first()
+    data = artist.serialize
+    return render_template('forms/edit_artist.html', form=form, artist=data)
+
+
+@bp.route('/artists/<int:artist_id>/edit', methods=['POST'])
+def edit_artist_submission(artist_id):
+    data = request.form
+
+    try:
+        genres = Genre.get_or_create(request.form.getlist('genres'))
+
+        tmp_seeking_venue = request.form.get('seeking_venue', default=False)
+        seeking_venue = True if tmp_seeking_venue == 'y' else False
+
+        artist = Artist.query.get(artist_id)
+        artist.name = data['name']
+        artist.city = data['city']
+        artist.state = data['state']
+        artist.phone = data['phone']
+        artist.genres = genres
+        artist.seeking_venue = seeking_venue
+        artist.image_link = data['image_link']
+        artist.facebook_link = data['facebook_link']
+        artist.website = data['website']
+        Artist.touch([artist_id])
+        Venue.touch(db.session.query(Show.venue_id).filter(Show.artist_id == artist_id))
+        db.session.flush()
+        ShowListing.refresh(artist_ids=[artist_id])
+        db.session.commit()
+        response_cache.invalidate('artists', 'shows', f'artist:{artist_id}')
+        flash('Artist ' + data['name'] + ' was successfully updated!')
+    except:
+        db.session.rollback()
+        flash('An error occurred. Artist ' + data['name'] + ' could not be updated.')
+    finally:
+        db.session.close()
+
+    return redirect(url_for('main.show_artist', artist_id=artist_id))
+
+
+@bp.route('/venues/<int:venue_id>/edit', methods=['GET'])
+@read_from_primary
+def edit_venue(venue_id):
+    form = VenueForm()
+
+    venue = db.session.query(Venue).filter(Venue.id == venue_id).first()
+    data = venue.serialize
+    return render_template('forms/edit_venue.html', form=form, venue=data)
+
+
+@bp.route('/venues/<int:venue_id>/edit', methods=['POST'])
+def edit_venue_submission(venue_id):
+    data = request.form
+
+    try:
+        genres = Genre.get_or_create(request.form.getlist('genres'))
+
+        tmp_seeking_artist = request.form.get('seeking_artist', default=False)
+        seeking_artist = True if tmp_seeking_artist == 'y' else False
+
+        venue = Venue.query.get(venue_id)
+        venue.name = data['name']
+        venue.city = data['city']
+        venue.state = data['state']
+        venue.address = data['address']
+        venue.genres = genres
+        venue.phone = data['phone']
+        venue.seeking_talent = seeking_artist
+        venue.image_link = data['image_link']
+        venue.facebook_link = data['facebook_link']
+        venue.website = data['website']
+        Venue.touch([venue_id])
+        Artist.touch(db.session.query(Show.artist_id).filter(Show.venue_id == venue_id))
+        db.session.flush()
+        ShowListing.refresh(venue_ids=[venue_id])
+        db.session.commit()
+        response_cache.invalidate('venues', 'shows', f'venue:{venue_id}')
+        flash('Venue ' + data['name'] + ' was successfully updated!')
+    except:
+        db.session.rollback()
+        flash('An error occurred. Venue ' + data['name'] + ' could not be updated.')
+    finally:
+        db.session.close()
+    return redirect(url_for('main.show_venue', venue_id=venue_id))
+
+
+#  Create Artist
+#  ----------------------------------------------------------------
+
+@bp.route('/artists/create', methods=['GET'])
+def create_artist_form():
+    form = ArtistForm()
+    return render_template('forms/new_artist.html', form=form)
+
+
+@bp.route('/artists/create', methods=['POST'])
+def create_artist_submission():
+    data = request.form
+
+    try:
+
+        genres = Genre.get_or_create(request.form.getlist('genres'))
+
+        tmp_seeking_venue = request.form.get('seeking_venue', default=False)
+        seeking_venue = True if tmp_seeking_venue == 'y' else False
+
+        new_artist = Artist(
+            name=data['name'],
+            city=data['city'],
+            state=data['state'],
+            phone=data['phone'],
+            genres=genres,
+            image_link=data['image_link'],
+            facebook_link=data['facebook_link'],
+            seeking_venue=seeking_venue,
+            website=data['website']
+        )
+        db.session.add(new_artist)
+        db.session.commit()
+        response_cache.invalidate('artists')
+        flash('Artist ' + data['name'] + ' was successfully listed!')
+    except:
+        db.session.rollback()
+        flash('An error occurred. Artist ' + data['name'] + ' could not be listed.')
+    finally:
+        db.session.close()
+
+    return render_template('pages/home.html')
+
+
+#  Shows
+#  ----------------------------------------------------------------
+
+@bp.route('/shows')
+@response_cache.cached('shows')
+def shows():
+    page = paginate(ShowListing.listing_query(), [ShowListing.start_time, ShowListing.id])
+
+    return Response(stream_template('pages/shows.html', shows=page.items, page=page))
+
+
+@bp.route('/shows/calendar')
+def shows_calendar():
+    try:
+        args = calendar_args()
+    except ValueError:
+        abort(400)
+    rows = ShowListing.calendar_query(**args).yield_per(current_app.config['API_STREAM_BATCH_SIZE'])
+    days = ShowListing.group_by_day(rows, args['start'].tzinfo)
+    return Response(stream_template('pages/calendar.html', days=days,
+                                    last_day=(args['end'] - timedelta(microseconds=1)).date(), **args))
+
+
+@bp.route('/shows/search', methods=['POST'])
+@read_from_replica
+def search_shows():
+    search_term = request.form.get('search_term', '')
+
+    shows = name_search(ShowListing.listing_query(), [ShowListing.artist_name, ShowListing.venue_name],
+                        search_term, current_app.config['SEARCH_RESULT_LIMIT'], db.engine.dialect.name).all()
+
+    response = {'count': len(shows),
+                "data": shows}
+
+    return render_template('pages/search_show.html', results=response,
+                           search_term=search_term)
+
+
+@bp.route('/shows/create')
+def create_shows():
+    form = ShowForm()
+    return render_template('forms/new_show.html', form=form)
+
+
+@bp.route('/shows/create', methods=['POST'])
+def create_show_submission():
+    data = request.form
+    try:
+        venue_id, artist_id = int(data['venue_id']), int(data['artist_id'])
+        start_time = as_utc(dateutil.parser.parse(data['start_time']))
+        duration = parse_duration(data.get('duration'))
+        _, errors = Show.book([{'venue_id': venue_id, 'artist_id': artist_id, 'start_time': start_time,
+                                'end_time': start_time + duration}])
+        if errors:
+            db.session.rollback()
+            flash(' '.join(message for messages in errors[0].values() for message in messages)
+                  + '. Show could not be listed.')
+            return render_template('pages/home.html')
+        db.session.commit()
+        response_cache.invalidate('shows', 'venues', f'venue:{venue_id}', f'artist:{artist_id}')
+        flash('Show was successfully listed!')
+    except:
+        db.session.rollback()
+        flash('An error occurred. Show could not be listed.')
+    finally:
+        db.session.close()
+
+    return render_template('pages/home.html')
+
+
+@bp.route('/shows/batch')
+def create_shows_batch():
+    form = ShowBatchForm()
+    return render_template('forms/new_shows_batch.html', form=form)
+
+
+@bp.route('/shows/batch', methods=['POST'])
+def create_shows_batch_submission():
+    """List many shows, e.g. a whole tour, in one transaction.
+
+    Every row is parsed before the database is touched, and the valid ones
+    are inserted together (:meth:`Show.book`). Invalid rows are reported
+    per row, by position, without holding back the others. JSON requests
+    get ``{"created": [...], "errors": [...]}`` back; the form is shown
+    again with the errors.
+    """
+    # Not built for JSON, which Flask-WTF would try to read as form data.
+    form = None if request.is_json else ShowBatchForm()
+    limit = current_app.config['SHOW_BATCH_MAX_ROWS']
+    try:
+        rows = batch_rows()
+        if len(rows) > limit:
+            raise ValueError(f'At most {limit} shows per batch')
+        if not rows:
+            raise ValueError('No shows given')
+    except ValueError as e:
+        if request.is_json:
+            return jsonify({'error': str(e)}), 400
+        flash(f'{e}. No show was listed.')
+        return render_template('forms/new_shows_batch.html', form=form), 400
+
+    parsed = [parse_batch_row(row) for row in rows]
+    errors = {position: row_errors for position, (_, row_errors) in enumerate(parsed) if row_errors}
+    valid = [position for position in range(len(rows)) if position not in errors]
+    try:
+        booked, booking_errors = Show.book([parsed[position][0] for position in valid])
+        db.session.commit()
+    except:
+        db.session.rollback()
+        if request.is_json:
+            raise
+        flash('An error occurred. No show was listed.')
+        return render_template('forms/new_shows_batch.html', form=form), 500
+    finally:
+        db.session.close()
+    errors.update((valid[index], index_errors) for index, index_errors in booking_errors.items())
+    created = {position: parsed[position][0]['id'] for index, position in enumerate(valid)
+               if index not in booking_errors}
+
+    if booked:
+        response_cache.invalidate('shows', 'venues', *{f"venue:{show['venue_id']}" for show in booked},
+                                  *{f"artist:{show['artist_id']}" for show in booked})
+    if request.is_json:
+        return jsonify({'created': [{'index': position, 'id': show_id} for position, show_id in created.items()],
+                        'errors': [{'index': position, 'errors': errors[position]} for position in sorted(errors)]})
+
+    # The form comes back holding just the rejected lines, ready to be fixed and resent.
+    lines = {position: ', '.join(rows[position].values()) for position in errors}
+    form.shows.data = '\n'.join(lines[position] for position in sorted(errors))
+    flash(f'{len(created)} of {len(rows)} shows were successfully listed!')
+    return render_template('forms/new_shows_batch.html', form=form,
+                           errors=[(position + 1, lines[position], errors[position]) for position in sorted(errors)])
+
+
+@bp.app_errorhandler(404)
+def not_found_error(error):
+    metrics.count_error(404)
+    return render_template('errors/404.html'), 404
+
+
+@bp.app_errorhandler(500)
+def server_error(error):
+    metrics.count_error(500)
+    return render_template('errors/500.html'), 500